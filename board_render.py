@@ -0,0 +1,62 @@
+import io
+from functools import lru_cache
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:   # Pillow 없으면 이미지 보드 비활성화 (버튼 보드만 사용)
+    Image = None
+
+# 버튼 25개 제한을 넘는 큰 보드(최대 10×10)를 이미지로 그림
+# - 타일은 한 번 그린 스프라이트 아틀라스에서 잘라 쓰고
+# - 좌표 라벨 + 닫힌 타일만 있는 배경은 보드 크기별로 캐시
+# - 완성된 프레임(PNG)은 (size, revealed, bombs) 비트마스크로 LRU 캐시
+MAX_RENDER_SIZE = 10
+TILE  = 40
+LABEL = 24
+COLS  = "ABCDEFGHIJ"
+
+def available() -> bool:
+    return Image is not None
+
+@lru_cache(maxsize=1)
+def _sprites():
+    atlas = Image.new("RGBA", (TILE*3, TILE), (0, 0, 0, 0))
+    d = ImageDraw.Draw(atlas)
+    for i, fill in enumerate(((79, 84, 92), (46, 204, 113), (231, 76, 60))):
+        d.rounded_rectangle([i*TILE+2, 2, (i+1)*TILE-3, TILE-3], radius=6, fill=fill)
+    c = TILE // 2
+    x0 = TILE      # 💎
+    d.polygon([(x0+c, 8), (x0+TILE-10, c), (x0+c, TILE-8), (x0+10, c)], fill=(255, 255, 255))
+    x0 = TILE*2    # 💣
+    d.ellipse([x0+10, 10, x0+TILE-10, TILE-10], fill=(20, 20, 20))
+    return {
+        name: atlas.crop((i*TILE, 0, (i+1)*TILE, TILE))
+        for i, name in enumerate(("hidden", "gem", "bomb"))
+    }
+
+@lru_cache(maxsize=MAX_RENDER_SIZE)
+def _frame(size: int):
+    side = LABEL + size*TILE
+    img  = Image.new("RGBA", (side, side), (47, 49, 54, 255))
+    d    = ImageDraw.Draw(img)
+    font = ImageFont.load_default()
+    hidden = _sprites()["hidden"]
+    for i in range(size):
+        d.text((LABEL + i*TILE + TILE//2 - 3, 6), COLS[i], fill=(220, 221, 222), font=font)
+        d.text((4, LABEL + i*TILE + TILE//2 - 6), str(i+1), fill=(220, 221, 222), font=font)
+        for j in range(size):
+            img.paste(hidden, (LABEL + j*TILE, LABEL + i*TILE), hidden)
+    return img
+
+@lru_cache(maxsize=1024)
+def render_board(size: int, revealed: int, bombs: int) -> bytes:
+    # revealed: 열린 칸 비트마스크 (y*size+x), bombs: 그 중 지뢰인 칸
+    img = _frame(size).copy()
+    sp  = _sprites()
+    for c in range(size*size):
+        if revealed >> c & 1:
+            tile = sp["bomb"] if bombs >> c & 1 else sp["gem"]
+            img.paste(tile, (LABEL + (c % size)*TILE, LABEL + (c // size)*TILE), tile)
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", optimize=False)
+    return buf.getvalue()
@@ -0,0 +1,15 @@
+import os
+import json
+
+# JSON 설정 파일 캐시: 파일 mtime 이 바뀔 때만 다시 파싱 (hot-reload)
+_cache = {}  # path -> (mtime_ns, data)
+
+def load_json(path: str):
+    mtime = os.stat(path).st_mtime_ns
+    hit = _cache.get(path)
+    if hit and hit[0] == mtime:
+        return hit[1]
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    _cache[path] = (mtime, data)
+    return data
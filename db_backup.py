@@ -0,0 +1,51 @@
+import os
+import glob
+import time
+import sqlite3
+
+# 게임 DB 온라인 백업 / 정리
+# - 워커 스레드에서 별도 연결로 실행 (asyncio.to_thread 로 호출)
+# - WAL 모드에서 읽기 트랜잭션을 잡고 backup API 로 작은 페이지 단위 복사:
+#   스냅샷이 고정되므로 게임 쪽 쓰기를 막지 않고, 쓰기 때문에 백업이 재시작되지도 않음
+BACKUP_DIR   = "backups"
+STEP_PAGES   = 64
+STEP_SLEEP   = 0.005   # 스텝 사이 쉬는 시간 (초)
+KEEP_BACKUPS = 10
+VACUUM_PAGES = 1000    # 한 번에 반환할 빈 페이지 수
+
+def enable_online_maintenance(conn):
+    # 봇 시작 시 메인 연결에서 한 번 호출
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        # INCREMENTAL 로 바꾸려면 VACUUM 한 번이 필요 (최초 1회만)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+
+def backup_db(path, dest_dir=BACKUP_DIR, keep=KEEP_BACKUPS) -> str:
+    os.makedirs(dest_dir, exist_ok=True)
+    name = os.path.splitext(os.path.basename(path))[0]
+    dest = os.path.join(dest_dir, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.db")
+    src = sqlite3.connect(path, timeout=30)
+    dst = sqlite3.connect(dest)
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=STEP_PAGES, sleep=STEP_SLEEP)
+        src.rollback()
+    finally:
+        dst.close()
+        src.close()
+    # 오래된 백업 정리 (파일명에 시각이 있어 정렬 = 시간순)
+    for old in sorted(glob.glob(os.path.join(dest_dir, f"{name}-*.db")))[:-keep]:
+        os.remove(old)
+    return dest
+
+def compact_db(path, pages=VACUUM_PAGES):
+    # 빈 페이지 일부 반환 + PASSIVE 체크포인트 (둘 다 쓰기를 오래 막지 않음)
+    conn = sqlite3.connect(path, timeout=5)
+    try:
+        # executescript 는 끝까지 step 하므로 incremental_vacuum 이 한 페이지에서 멈추지 않음
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        return conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    finally:
+        conn.close()
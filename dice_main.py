@@ -1,15 +1,30 @@
+import io
 import os
-import random, asyncio
+import asyncio
 import sqlite3
 import json
+import secrets
 from datetime import datetime, timedelta
 from collections import defaultdict
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 from discord.ui import View, Button, Select, Modal, TextInput
 
+from userlock import user_lock
+from ledger import Ledger
+from member_cache import MemberNames, lean_client_options
+from tree_sync import sync_if_changed
+from guild_config import GuildConfig, WrongChannel
+from profiling import profiler, install_signal_handler, DEFAULT_WINDOW, MAX_WINDOW
+from sharding import DB_TIMEOUT, shard_options, multi_process
+from ratelimit import rate_limited, RateLimited, RateLimitedView, reject, stats_embed
+from db_backup import enable_online_maintenance, backup_db, compact_db
+from history import GameHistory, HistoryView
+from fair_rng import new_server_seed, seed_hash, dice_roll
+import dice_render
+
 # ─── 1) Config & Constants ─────────────────────────────────────
 with open("keys.json", "r", encoding="utf-8") as f:
     cfg = json.load(f)
@@ -18,17 +33,34 @@ GUILD_ID      = cfg.get("guild_id")
 MENTION_ROLE_ID = None
 CONSOLE_CHANNEL_ID = cfg.get("console_channel_id")
 COMMAND_CHANNEL_ID = cfg.get("command_channel_id")
-test_guild    = discord.Object(id=GUILD_ID) if GUILD_ID else None
+GLOBAL_COMMANDS = cfg.get("global_commands", False)
+# 관리자 명령어는 운영 서버에만, 일반 명령어는 global_commands 면 전역 등록
+admin_guild   = discord.Object(id=GUILD_ID) if GUILD_ID else None
+test_guild    = None if GLOBAL_COMMANDS else admin_guild
+SYNC_SCOPES   = [test_guild] if test_guild is admin_guild else [test_guild, admin_guild]
+# 폴드/계속 DM 버튼은 게임을 만든 프로세스 메모리에만 있는데 DM interaction 은 항상
+# 샤드 0 으로 오므로, Dice 는 여러 프로세스로 나눠 띄울 수 없음 (한 프로세스 AutoShardedBot 은 가능)
+if multi_process(cfg):
+    raise SystemExit("dice bot: shard_ids (multi-process sharding) is not supported, use shard_count only")
+BACKUP_INTERVAL_H = cfg.get("backup_interval_hours", 6)
+LEAN_MODE     = cfg.get("lean_mode", False)
 
 NUMBERS_FOLDER = os.path.join(os.getcwd(), "numbers")
 MIN_PLAYERS = 2
 MAX_PLAYERS = 10
+# 토너먼트: 여러 테이블을 라운드마다 동시에 진행
+TOURNAMENT_MAX_PLAYERS  = 500
+TOURNAMENT_ROLL_TIMEOUT = 120   # 초, 라운드당 첫 주사위 선택 대기
+TOURNAMENT_MAX_ROUNDS   = 20
+TOURNAMENT_JOIN_TIMEOUT = 1800  # 초, 이 안에 시작하지 않으면 모집 취소 + 전액 환급
+DM_CONCURRENCY          = 8     # 전체 테이블 합산 동시 DM 전송 수
 
-game_counter = 0
 
 # ─── 2) Database setup ─────────────────────────────────────────
-conn   = sqlite3.connect("dice_game.db")
+DB_PATH = "dice_game.db"
+conn   = sqlite3.connect(DB_PATH, timeout=DB_TIMEOUT)
 cursor = conn.cursor()
+enable_online_maintenance(conn)
 cursor.execute("""
 CREATE TABLE IF NOT EXISTS users (
     user_id TEXT PRIMARY KEY,
@@ -36,6 +68,26 @@ CREATE TABLE IF NOT EXISTS users (
 )
 """)
 conn.commit()
+ledger  = Ledger(conn, "dice")
+history = GameHistory(conn, "dice")
+guild_config = GuildConfig(conn)
+# 예전 keys.json 의 command_channel_id 는 운영 서버 설정으로 옮김
+guild_config.setdefault_channel(GUILD_ID, COMMAND_CHANNEL_ID)
+
+def last_tag_number(prefix: str) -> int:
+    # 재시작해도 태그(#0042, T001-R1-01)가 겹치지 않도록 기록/원장에 남은 가장 큰 번호부터 이어감
+    # (모집 중 취소된 게임은 games 에 행이 없고 원장에만 태그가 남음)
+    n = 0
+    for table in ("games", "transactions"):
+        row = cursor.execute(
+            f"SELECT MAX(CAST(substr(tag, 2) AS INTEGER)) FROM {table} WHERE game='dice' AND tag GLOB ?",
+            (prefix + "[0-9]*",)
+        ).fetchone()
+        n = max(n, row[0] or 0)
+    return n
+
+game_counter       = last_tag_number("#")
+tournament_counter = last_tag_number("T")
 
 def get_user_chips(uid: int) -> int:
     cursor.execute("SELECT chips FROM users WHERE user_id = ?", (str(uid),))
@@ -44,34 +96,96 @@ def get_user_chips(uid: int) -> int:
         return row[0]
     cursor.execute("INSERT INTO users(user_id) VALUES(?)", (str(uid),))
     conn.commit()
+    ledger.record(uid, 1000, "signup")
     return 1000
 
-def update_user_chips(uid: int, new_chips: int):
-    cursor.execute("UPDATE users SET chips = ? WHERE user_id = ?", (new_chips, str(uid)))
+def try_debit(uid: int, amount: int, reason: str, tag: str = None) -> bool:
+    # 잔액 확인과 차감을 한 문장으로: 다른 샤드 프로세스와 동시에 써도 음수가 되지 않음
+    cursor.execute(
+        "UPDATE users SET chips = chips - ? WHERE user_id = ? AND chips >= ?",
+        (amount, str(uid), amount)
+    )
     conn.commit()
+    if cursor.rowcount == 0:
+        return False
+    ledger.record(uid, -amount, reason, tag)
+    return True
+
+def add_user_chips(uid: int, delta: int, reason: str, tag: str = None):
+    cursor.execute("UPDATE users SET chips = chips + ? WHERE user_id = ?", (delta, str(uid)))
+    conn.commit()
+    ledger.record(uid, delta, reason, tag)
+
+def refund_orphan_tournaments():
+    # 토너먼트는 메모리에만 있으므로 모집/진행 중에 재시작하면 참가비가 묶임
+    # → 시작 시 상금이 한 번도 지급되지 않은 토너먼트의 (참가비 - 환급) 을 돌려줌
+    # 상금 지급 도중 멈춘 토너먼트는 이중 지급 위험이 있어 제외:
+    #   transactions 에서 해당 tag 의 tournament_entry / refund / tournament_prize 행을 보고 직접 정산
+    rows = cursor.execute("""
+        SELECT user_id, tag, -SUM(delta) FROM transactions
+        WHERE game='dice' AND reason IN ('tournament_entry','refund') AND tag GLOB 'T[0-9]*'
+          AND tag NOT IN (SELECT tag FROM transactions WHERE game='dice' AND reason='tournament_prize')
+        GROUP BY user_id, tag HAVING SUM(delta) < 0
+    """).fetchall()
+    for uid, tag, amount in rows:
+        add_user_chips(int(uid), amount, "refund", tag)
+    ledger.flush()
+    return rows
+
+refunded = refund_orphan_tournaments()
+if refunded:
+    print(f"↩️ refunded {len(refunded)} unfinished tournament entries: "
+          f"{', '.join(sorted({tag for _, tag, _ in refunded}))}")
+
+@tasks.loop(seconds=5)
+async def flush_buffers():
+    # 예외가 나면 tasks.loop 가 멈추므로 여기서 잡고 다음 주기에 다시 시도 (버퍼는 남아 있음)
+    try:
+        ledger.tick()
+        history.flush()
+    except Exception as e:
+        print(f"⚠️ flush failed: {e!r}")
+
+@tasks.loop(hours=BACKUP_INTERVAL_H)
+async def backup_loop():
+    await run_backup(compact=True)
+
+async def run_backup(compact=False):
+    ledger.flush()
+    history.flush()
+    # 워커 스레드에서 실행하므로 게임 이벤트 루프는 막히지 않음
+    dest = await asyncio.to_thread(backup_db, DB_PATH)
+    if compact:
+        await asyncio.to_thread(compact_db, DB_PATH)
+    return dest
 
 # ─── 3) Bot setup ───────────────────────────────────────────────
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+if LEAN_MODE:
+    # 최소 intents: 멤버 청킹/캐시 없이 닉네임은 필요할 때만 fetch
+    intents = discord.Intents.none()
+    intents.guilds = True
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
 
-bot  = commands.Bot(command_prefix="!", intents=intents)
+bot  = commands.AutoShardedBot(
+    command_prefix="!", intents=intents,
+    **lean_client_options(LEAN_MODE), **shard_options(cfg)
+)
 tree = bot.tree
+member_names = MemberNames()
 
 console_channel = None
 
 # Active games per channel
 active_games = {}  # channel_id -> game_data
+active_tournaments = {}  # channel_id -> DiceTournament
+dm_slots = asyncio.Semaphore(DM_CONCURRENCY)
 
 def in_command_channel():
-    def predicate(inter: discord.Interaction) -> bool:
-        # DM, 콘솔 로그 채널 등은 제외
-        if inter.channel.id != COMMAND_CHANNEL_ID:
-            raise app_commands.CheckFailure(
-                f"❌ 이 명령어는 <#{COMMAND_CHANNEL_ID}> 채널에서만 사용할 수 있습니다."
-            )
-        return True
-    return app_commands.check(predicate)
+    # DM 은 제외, 길드별로 /setchannel 로 지정한 채널이 있으면 그 채널에서만
+    return guild_config.check()
 
 # ─── 4) Game Data Structure ────────────────────────────────────
 class DiceGame:
@@ -84,11 +198,50 @@ class DiceGame:
         self.initial_rolls = {}        # uid -> roll1
         self.second_rolls = {}         # uid -> roll2
         self.folded = set()            # uids who folded
+        self.refunded = set()          # uids who got the 50% fold refund
         self.responded = set()         # uids who made a choice
         self.join_msg = None           # channel message with join button
+        self.seed = new_server_seed()  # 끝나면 공개, 시작 시엔 해시만 공개
+        self.resolving = False         # 결과 처리 시작 여부 (중복 진행 방지)
+        self.tournament = None         # 토너먼트 테이블이면 소속 DiceTournament
+        self.done = None               # 토너먼트 테이블: 승자 목록을 받는 future
+
+class DiceTournament:
+    def __init__(self, channel, bet: int, table_size: int, host: int):
+        self.channel = channel
+        self.bet = bet                 # 참가비 (테이블 게임 자체는 칩 이동 없음)
+        self.table_size = table_size
+        self.host = host
+        self.tag = None                # ex: "T001"
+        self.players = []              # list of user IDs
+        self.msg = None                # channel message with join button
+        self.started = False
+
+def record_game(game: DiceGame, winners, reward: int):
+    # 참가자별 1행: 굴린 주사위는 "첫,두번째" 문자열로
+    for uid in game.participants:
+        rolls = [game.initial_rolls.get(uid), game.second_rolls.get(uid)]
+        rolls = ",".join(str(r) for r in rolls if r is not None) or None
+        if uid in winners:
+            outcome, payout = "win", reward
+        elif uid in game.folded:
+            outcome, payout = "fold", game.bet // 2 if uid in game.refunded else 0
+        else:
+            outcome, payout = "lose", 0
+        history.record(uid, game.tag, game.bet, payout, outcome, rolls=rolls, seed=game.seed)
+
+def commit_footer(embed, game: DiceGame):
+    embed.set_footer(text=f"🔒 seed hash: {seed_hash(game.seed)}")
+    return embed
+
+def reveal_footer(embed, game: DiceGame):
+    embed.set_footer(text=f"🔓 seed: {game.seed}")
+    return embed
 
 # ─── 5) Views ───────────────────────────────────────────────────
-class JoinView(View):
+class JoinView(RateLimitedView):
+    action = "join"
+
     def __init__(self, game: DiceGame):
         super().__init__(timeout=None)
         self.game = game
@@ -96,74 +249,70 @@ class JoinView(View):
     @discord.ui.button(label="참가", style=discord.ButtonStyle.primary)
     async def join(self, interaction: discord.Interaction, button: Button):
         uid = interaction.user.id
-        if uid in self.game.participants:
-            return await interaction.response.send_message("이미 참가하셨습니다!", ephemeral=True)
-        if len(self.game.participants) >= self.game.max_players:
-            return await interaction.response.send_message("참가 인원이 모두 찼습니다.", ephemeral=True)
-
-        # Deduct bet
-        chips = get_user_chips(uid)
-        if chips < self.game.bet:
-            return await interaction.response.send_message("🛑 잔액이 부족합니다.", ephemeral=True)
-        update_user_chips(uid, chips - self.game.bet)
-
-        self.game.participants.append(uid)
-        await interaction.response.send_message(f"✅ 참가 완료! …", ephemeral=True)
-        if console_channel:
-            await console_channel.send(
-                f"[{self.game.tag}] 🎉 <@{uid}> 참가 ({len(self.game.participants)}/{self.game.max_players})"
-            )
-        await self._update_join_embed(interaction)
+        async with user_lock(uid):
+            if uid in self.game.participants:
+                return await interaction.response.send_message("이미 참가하셨습니다!", ephemeral=True)
+            if len(self.game.participants) >= self.game.max_players:
+                return await interaction.response.send_message("참가 인원이 모두 찼습니다.", ephemeral=True)
 
-        if len(self.game.participants) == self.game.max_players:
-            self.start_game()
+            # Deduct bet
+            get_user_chips(uid)
+            if not try_debit(uid, self.game.bet, "bet", self.game.tag):
+                return await interaction.response.send_message("🛑 잔액이 부족합니다.", ephemeral=True)
+
+            self.game.participants.append(uid)
+            await interaction.response.send_message(f"✅ 참가 완료! …", ephemeral=True)
+            if console_channel:
+                await console_channel.send(
+                    f"[{self.game.tag}] 🎉 <@{uid}> 참가 ({len(self.game.participants)}/{self.game.max_players})"
+                )
+            await self._update_join_embed(interaction)
+
+            if len(self.game.participants) == self.game.max_players:
+                self.start_game()
 
     @discord.ui.button(label="취소", style=discord.ButtonStyle.secondary)
     async def cancel(self, interaction: discord.Interaction, button: Button):
         uid = interaction.user.id
-        if uid not in self.game.participants:
-            return await interaction.response.send_message("아직 참가하지 않으셨습니다.", ephemeral=True)
-
-        # 주최자가 취소하면 게임 전체 취소
-        if uid == self.game.host:
-            # 주최자 베팅 환급
-            chips = get_user_chips(uid)
-            update_user_chips(uid, chips + self.game.bet)
-            # 버튼 비활성화 후 메시지 수정
-            for item in self.children:
-                item.disabled = True
-            await interaction.response.edit_message(
-                embed=discord.Embed(
-                    title=f"{self.game.tag} 게임 취소됨",
-                    description="주최자가 게임을 취소했습니다.",
-                    color=0xff0000
-                ),
-                view=self
+        async with user_lock(uid):
+            if uid not in self.game.participants:
+                return await interaction.response.send_message("아직 참가하지 않으셨습니다.", ephemeral=True)
+
+            # 주최자가 취소하면 게임 전체 취소
+            if uid == self.game.host:
+                # 주최자 베팅 환급
+                add_user_chips(uid, self.game.bet, "refund", self.game.tag)
+                # 버튼 비활성화 후 메시지 수정
+                for item in self.children:
+                    item.disabled = True
+                await interaction.response.edit_message(
+                    embed=discord.Embed(
+                        title=f"{self.game.tag} 게임 취소됨",
+                        description="주최자가 게임을 취소했습니다.",
+                        color=0xff0000
+                    ),
+                    view=self
+                )
+                # 게임 데이터 삭제
+                active_games.pop(self.game.channel.id, None)
+                if console_channel:
+                    await console_channel.send(f"[{self.game.tag}] ❌ 주최자 <@{uid}> 게임 취소")
+                return
+
+            # 일반 참가자 취소: 전액 환급 후 명단에서 제거
+            add_user_chips(uid, self.game.bet, "refund", self.game.tag)
+            self.game.participants.remove(uid)
+            await interaction.response.send_message(
+                f"❎ 참가 취소! 베팅액 `{self.game.bet}`칩이 환급되었습니다.",
+                ephemeral=True
             )
-            # 게임 데이터 삭제
-            del active_games[self.game.channel.id]
             if console_channel:
-                await console_channel.send(f"[{self.game.tag}] ❌ 주최자 <@{uid}> 게임 취소")
-            return
-
-        # 일반 참가자 취소: 전액 환급 후 명단에서 제거
-        chips = get_user_chips(uid)
-        update_user_chips(uid, chips + self.game.bet)
-        self.game.participants.remove(uid)
-        await interaction.response.send_message(
-            f"❎ 참가 취소! 베팅액 `{self.game.bet}`칩이 환급되었습니다.",
-            ephemeral=True
-        )
-        if console_channel:
-            await console_channel.send(f"[{self.game.tag}] 🚪 <@{uid}> 참가 취소")
-        await self._update_join_embed(interaction)
+                await console_channel.send(f"[{self.game.tag}] 🚪 <@{uid}> 참가 취소")
+            await self._update_join_embed(interaction)
 
     async def _update_join_embed(self, interaction: discord.Interaction):
         # 참가자 리스트 & 카운트 갱신
-        names = [
-            interaction.guild.get_member(u).display_name
-            for u in self.game.participants
-        ]
+        names = await member_names.many(interaction.guild, self.game.participants)
         embed = discord.Embed(
             title=f"🎲 Dice Game 모집 중 {self.game.tag}",
             color=0x00ff00
@@ -176,6 +325,7 @@ class JoinView(View):
             value=f"{len(self.game.participants)}/{self.game.max_players}명",
             inline=True
         )
+        commit_footer(embed, self.game)
         await self.game.join_msg.edit(embed=embed, view=self)
 
     def start_game(self):
@@ -186,7 +336,7 @@ class JoinView(View):
         bot.loop.create_task(begin_first_roll(self.game))
         bot.loop.create_task(first_roll_timeout(self.game))
 
-class ChoiceView(View):
+class ChoiceView(RateLimitedView):
     def __init__(self, game: DiceGame, uid: int):
         super().__init__(timeout=None)
         self.game = game
@@ -196,99 +346,214 @@ class ChoiceView(View):
     async def fold(self, interaction: discord.Interaction, button: Button):
         if interaction.user.id != self.uid:
             return await interaction.response.send_message("❌ 당신의 게임이 아닙니다.", ephemeral=True)
-        if self.uid in self.game.responded:
-            return await interaction.response.send_message("이미 선택하셨습니다.", ephemeral=True)
-
-        self.game.folded.add(self.uid)
-        self.game.responded.add(self.uid)
-        # Refund 50%
-        refund = self.game.bet // 2
-        chips = get_user_chips(self.uid)
-        update_user_chips(self.uid, chips + refund)
-        embed = discord.Embed(
-            title="💤 Fold",
-            description=f"폴드 하셨습니다. `{refund}`칩 환급되었습니다.",
-            color=0xE67E22
-        )
-        await interaction.response.edit_message(embed=embed, view=None)
-        # 콘솔에 폴드 로그
-        if console_channel:
-            await console_channel.send(f"[{self.game.tag}] 💤 <@{self.uid}> 폴드")
-
-        # Check if all responded
-        if len(self.game.responded) == len(self.game.participants):
-            remaining = [u for u in self.game.participants if u not in self.game.folded]
-            # 남은 인원이 0명 혹은 1명일 때 즉시 종료
-            if len(remaining) <= 1:
-                bot.loop.create_task(resolve_immediate(self.game))
+        async with user_lock(self.uid):
+            if self.uid in self.game.responded:
+                return await interaction.response.send_message("이미 선택하셨습니다.", ephemeral=True)
+
+            self.game.folded.add(self.uid)
+            self.game.responded.add(self.uid)
+            if self.game.tournament:
+                description = "폴드 하셨습니다. 이번 라운드에서 탈락합니다."
             else:
-                bot.loop.create_task(begin_second_roll(self.game))
+                # Refund 50%
+                refund = self.game.bet // 2
+                add_user_chips(self.uid, refund, "fold_refund", self.game.tag)
+                self.game.refunded.add(self.uid)
+                description = f"폴드 하셨습니다. `{refund}`칩 환급되었습니다."
+            embed = discord.Embed(title="💤 Fold", description=description, color=0xE67E22)
+            await interaction.response.edit_message(embed=embed, view=None)
+            # 콘솔에 폴드 로그
+            if console_channel and not self.game.tournament:
+                await console_channel.send(f"[{self.game.tag}] 💤 <@{self.uid}> 폴드")
+
+            # Check if all responded
+            if len(self.game.responded) == len(self.game.participants):
+                remaining = [u for u in self.game.participants if u not in self.game.folded]
+                # 남은 인원이 0명 혹은 1명일 때 즉시 종료
+                if len(remaining) <= 1:
+                    bot.loop.create_task(resolve_immediate(self.game))
+                else:
+                    bot.loop.create_task(begin_second_roll(self.game))
 
     @discord.ui.button(label="계속", style=discord.ButtonStyle.success)
     async def cont(self, interaction: discord.Interaction, button: Button):
         if interaction.user.id != self.uid:
             return await interaction.response.send_message("❌ 당신의 게임이 아닙니다.", ephemeral=True)
-        if self.uid in self.game.responded:
-            return await interaction.response.send_message("이미 선택하셨습니다.", ephemeral=True)
+        async with user_lock(self.uid):
+            if self.uid in self.game.responded:
+                return await interaction.response.send_message("이미 선택하셨습니다.", ephemeral=True)
 
-        self.game.responded.add(self.uid)
-        embed = discord.Embed(
-            title="▶️ Continue",
-            description="두 번째 주사위를 굴리기 전까지 대기중입니다…",
-            color=0x2ECC71
-        )
-        await interaction.response.edit_message(embed=embed, view=None)
-        # 콘솔에 계속 진행 로그
-        if console_channel:
-            await console_channel.send(f"[{self.game.tag}] ▶️ <@{self.uid}> 계속 진행")
+            self.game.responded.add(self.uid)
+            embed = discord.Embed(
+                title="▶️ Continue",
+                description="두 번째 주사위를 굴리기 전까지 대기중입니다…",
+                color=0x2ECC71
+            )
+            await interaction.response.edit_message(embed=embed, view=None)
+            # 콘솔에 계속 진행 로그
+            if console_channel and not self.game.tournament:
+                await console_channel.send(f"[{self.game.tag}] ▶️ <@{self.uid}> 계속 진행")
 
-        # 모두 응답했으면
-        if len(self.game.responded) == len(self.game.participants):
-            remaining = [u for u in self.game.participants if u not in self.game.folded]
-            if len(remaining) == 1:
-                bot.loop.create_task(resolve_immediate(self.game))
-            else:
-                bot.loop.create_task(begin_second_roll(self.game))
+            # 모두 응답했으면
+            if len(self.game.responded) == len(self.game.participants):
+                remaining = [u for u in self.game.participants if u not in self.game.folded]
+                if len(remaining) == 1:
+                    bot.loop.create_task(resolve_immediate(self.game))
+                else:
+                    bot.loop.create_task(begin_second_roll(self.game))
+
+class TournamentView(RateLimitedView):
+    action = "join"
+
+    def __init__(self, t: DiceTournament):
+        super().__init__(timeout=None)
+        self.t = t
+
+    @discord.ui.button(label="참가", style=discord.ButtonStyle.primary)
+    async def join(self, interaction: discord.Interaction, button: Button):
+        uid = interaction.user.id
+        async with user_lock(uid):
+            if self.t.started:
+                return await interaction.response.send_message("이미 시작된 토너먼트입니다.", ephemeral=True)
+            if uid in self.t.players:
+                return await interaction.response.send_message("이미 참가하셨습니다!", ephemeral=True)
+            if len(self.t.players) >= TOURNAMENT_MAX_PLAYERS:
+                return await interaction.response.send_message("참가 인원이 모두 찼습니다.", ephemeral=True)
+            get_user_chips(uid)
+            if not try_debit(uid, self.t.bet, "tournament_entry", self.t.tag):
+                return await interaction.response.send_message("🛑 잔액이 부족합니다.", ephemeral=True)
+            self.t.players.append(uid)
+            await interaction.response.send_message("✅ 토너먼트 참가 완료!", ephemeral=True)
+            await self.t.msg.edit(embed=tournament_embed(self.t), view=self)
+
+    @discord.ui.button(label="취소", style=discord.ButtonStyle.secondary)
+    async def cancel(self, interaction: discord.Interaction, button: Button):
+        uid = interaction.user.id
+        async with user_lock(uid):
+            if self.t.started:
+                return await interaction.response.send_message("이미 시작된 토너먼트입니다.", ephemeral=True)
+            if uid not in self.t.players:
+                return await interaction.response.send_message("아직 참가하지 않으셨습니다.", ephemeral=True)
+
+            # 주최자가 취소하면 전원 환급 후 토너먼트 취소
+            if uid == self.t.host:
+                self.t.started = True
+                for p in self.t.players:
+                    add_user_chips(p, self.t.bet, "refund", self.t.tag)
+                for item in self.children:
+                    item.disabled = True
+                await interaction.response.edit_message(
+                    embed=discord.Embed(
+                        title=f"{self.t.tag} 토너먼트 취소됨",
+                        description="주최자가 토너먼트를 취소했습니다. 참가비는 전액 환급되었습니다.",
+                        color=0xff0000
+                    ),
+                    view=self
+                )
+                active_tournaments.pop(self.t.channel.id, None)
+                if console_channel:
+                    await console_channel.send(f"[{self.t.tag}] ❌ 주최자 <@{uid}> 토너먼트 취소")
+                return
+
+            add_user_chips(uid, self.t.bet, "refund", self.t.tag)
+            self.t.players.remove(uid)
+            await interaction.response.send_message(
+                f"❎ 참가 취소! 참가비 `{self.t.bet}`칩이 환급되었습니다.",
+                ephemeral=True
+            )
+            await self.t.msg.edit(embed=tournament_embed(self.t), view=self)
+
+    @discord.ui.button(label="시작", style=discord.ButtonStyle.success)
+    async def start(self, interaction: discord.Interaction, button: Button):
+        if interaction.user.id != self.t.host:
+            return await interaction.response.send_message("❌ 주최자만 시작할 수 있습니다.", ephemeral=True)
+        if self.t.started:
+            return await interaction.response.send_message("이미 시작된 토너먼트입니다.", ephemeral=True)
+        if len(self.t.players) < MIN_PLAYERS:
+            return await interaction.response.send_message(
+                f"❌ 최소 {MIN_PLAYERS}명이 필요합니다.", ephemeral=True
+            )
+        self.t.started = True
+        for item in self.children:
+            item.disabled = True
+        await interaction.response.edit_message(embed=tournament_embed(self.t), view=self)
+        bot.loop.create_task(run_tournament(self.t))
 
 # ─── 6) Game Flow ──────────────────────────────────────────────
+async def send_dm(uid: int, **kwargs):
+    # 여러 테이블이 동시에 DM 을 보내도 전역으로 동시 요청 수 제한
+    async with dm_slots:
+        # 유저 객체 fetch 없이 id 로 바로 DM 채널 (캐시에 있으면 HTTP 없음)
+        dm = await bot.create_dm(discord.Object(id=uid))
+        return await dm.send(**kwargs)
+
+def finish_game(game: DiceGame, winners):
+    # 토너먼트 테이블은 라운드 진행자에게 결과만 넘기고, 일반 게임은 채널에서 해제
+    if game.tournament:
+        if not game.done.done():
+            game.done.set_result(list(winners))
+    elif active_games.get(game.channel.id) is game:
+        del active_games[game.channel.id]
+
+async def send_first_roll(game: DiceGame, uid: int):
+    roll = game.initial_rolls[uid]
+    path = os.path.join(NUMBERS_FOLDER, f"{roll}.png")
+    if os.path.isfile(path):
+        await send_dm(uid, file=discord.File(path))
+    else:
+        await send_dm(uid, content=f"🎲 당신의 첫 번째 주사위: **{roll}**")
+    embed_sel = discord.Embed(
+        title=f"🎲 선택 {game.tag}",
+        description="‘폴드’ 또는 ‘계속’ 버튼을 눌러주세요.",
+        color=0xF1C40F
+    )
+    await send_dm(uid, embed=embed_sel, view=ChoiceView(game, uid))
+    # 콘솔에 첫 주사위 결과 로그
+    if console_channel and not game.tournament:
+        await console_channel.send(f"[{game.tag}] 🎲 <@{uid}> 첫 주사위: {roll}")
+
 async def begin_first_roll(game: DiceGame):
     # Notify channel
-    embed = discord.Embed(
-        title="🎲 첫 번째 주사위 굴리는 중…",
-        color=0x3498DB
-    )
-    await game.join_msg.channel.send(embed=embed)
+    if not game.tournament:
+        embed = discord.Embed(
+            title="🎲 첫 번째 주사위 굴리는 중…",
+            color=0x3498DB
+        )
+        await game.channel.send(embed=embed)
     # Roll for each participant
     for uid in game.participants:
-        roll = random.randint(1, 20)
-        game.initial_rolls[uid] = roll
-        # DM with image if exists
-        user = await bot.fetch_user(uid)
-        dm = await user.create_dm()
-        path = os.path.join(NUMBERS_FOLDER, f"{roll}.png")
-        if os.path.isfile(path):
-            await dm.send(file=discord.File(path))
-        else:
-            await dm.send(f"🎲 당신의 첫 번째 주사위: **{roll}**")
-        view = ChoiceView(game, uid)
-        view = ChoiceView(game, uid)
-        embed_sel = discord.Embed(
-            title="🎲 선택",
-            description="‘폴드’ 또는 ‘계속’ 버튼을 눌러주세요.",
-            color=0xF1C40F
-        )
-        await dm.send(embed=embed_sel, view=view)
-        # 콘솔에 첫 주사위 결과 로그
-        if console_channel:
-            await console_channel.send(f"[{game.tag}] 🎲 <@{uid}> 첫 주사위: {roll}")
+        game.initial_rolls[uid] = dice_roll(game.seed, uid, 1)
+    # DM 은 동시에 보내고, DM 을 막아 둔 유저는 타임아웃으로 탈락
+    await asyncio.gather(
+        *(send_first_roll(game, uid) for uid in game.participants),
+        return_exceptions=True
+    )
 
 async def resolve_immediate(game: DiceGame):
+    # 타임아웃과 마지막 선택이 겹쳐도 결과 처리는 한 번만
+    if game.resolving:
+        return
+    game.resolving = True
+    try:
+        await _resolve_immediate(game)
+    finally:
+        # 도중에 예외가 나도 채널 / 토너먼트 라운드가 멈추지 않게 (이미 정리됐으면 무시됨)
+        finish_game(game, [])
+
+async def _resolve_immediate(game: DiceGame):
     # 남은 플레이어(폴드하지 않은)가 1명인 즉시 승리 처리
     remaining = [u for u in game.participants if u not in game.folded]
+    if game.tournament:
+        record_game(game, remaining, 0)
+        finish_game(game, remaining)
+        return
     if not remaining:
         # 모두 폴드한 경우
-        await game.channel.send("모두 폴드하여 우승자가 없습니다.")
-        del active_games[game.channel.id]
+        await game.channel.send(embed=reveal_footer(
+            discord.Embed(description="모두 폴드하여 우승자가 없습니다."), game
+        ))
+        record_game(game, [], 0)
+        finish_game(game, [])
         return
 
     winner = remaining[0]
@@ -300,8 +565,8 @@ async def resolve_immediate(game: DiceGame):
 
     # 승자에게 전부 지급
     reward = pot
-    chips = get_user_chips(winner)
-    update_user_chips(winner, chips + reward)
+    add_user_chips(winner, reward, "payout", game.tag)
+    record_game(game, [winner], reward)
 
     # 결과 공개
     embed = discord.Embed(title="🎲 Dice Game 결과 (즉시 종료)", color=0x00ff00)
@@ -313,54 +578,75 @@ async def resolve_immediate(game: DiceGame):
             else f"{init}"
         )
         mark = "🏆" if uid == winner else ""
-        member = game.join_msg.guild.get_member(uid)
-        name = member.display_name if member else str(uid)
+        name = await member_names.display_name(game.channel.guild, uid)
         lines.append(f"{mark} {name}: {status}")
     embed.description = "\n".join(lines)
     embed.add_field(
         name="우승자",
-        value=f"{game.join_msg.guild.get_member(winner).display_name}님\n획득 칩: {reward}",
+        value=f"{await member_names.display_name(game.channel.guild, winner)}님\n획득 칩: {reward}",
         inline=False
     )
 
+    reveal_footer(embed, game)
     await game.channel.send(embed=embed)
 
     # 게임 정리
-    del active_games[game.channel.id]
+    finish_game(game, [winner])
 
-async def begin_second_roll(game: DiceGame):
-    # Roll second for those who did not fold
-    # 알림: 두 번째 주사위 단계 시작
-    embed = discord.Embed(
-        title="🎲 두 번째 주사위 굴리는 중...",
-        color=0x3498DB
-    )
-    await game.join_msg.channel.send(embed=embed)
-    if console_channel:
-        await console_channel.send(f"[{game.tag}] 🎲 두 번째 주사위 시작")
-    cont = [u for u in game.participants if u not in game.folded]
-    for uid in cont:
-        roll = random.randint(1, 20)
-        game.second_rolls[uid] = roll
-        game_sum = game.initial_rolls[uid] + roll
-        # DM second roll
-        user = await bot.fetch_user(uid)
-        dm = await user.create_dm()
+async def send_second_roll(game: DiceGame, uid: int):
+    first, roll = game.initial_rolls[uid], game.second_rolls[uid]
+    game_sum = first + roll
+    if dice_render.available():
+        # 첫 번째 + 두 번째 = 합계 합성 이미지 한 장으로 DM 1통
+        png = dice_render.roll_pair(first, roll)
+        e2 = discord.Embed(
+            title="🏁 합계",
+            description=f"{first} + {roll} = **{game_sum}**",
+            color=0x9B59B6
+        )
+        e2.set_image(url="attachment://roll.png")
+        await send_dm(uid, embed=e2, file=discord.File(io.BytesIO(png), filename="roll.png"))
+    else:
         path = os.path.join(NUMBERS_FOLDER, f"{roll}.png")
         if os.path.isfile(path):
-            await dm.send(file=discord.File(path))
+            await send_dm(uid, file=discord.File(path))
         else:
-            await dm.send(f"🎲 두 번째 주사위: **{roll}**")
+            await send_dm(uid, content=f"🎲 두 번째 주사위: **{roll}**")
         # 합계 알림도 Embed로
         e2 = discord.Embed(
             title="🏁 합계",
             description=f"첫 번째 + 두 번째 주사위 합: **{game_sum}**",
             color=0x9B59B6
         )
-        await dm.send(embed=e2)
-        # 콘솔에 두 번째 주사위 결과 로그
+        await send_dm(uid, embed=e2)
+    # 콘솔에 두 번째 주사위 결과 로그
+    if console_channel and not game.tournament:
+        await console_channel.send(f"[{game.tag}] 🎲 <@{uid}> 두 번째 주사위: {roll} (합계 {game_sum})")
+
+async def begin_second_roll(game: DiceGame):
+    if game.resolving:
+        return
+    game.resolving = True
+    try:
+        await _second_roll(game)
+    finally:
+        finish_game(game, [])
+
+async def _second_roll(game: DiceGame):
+    # Roll second for those who did not fold
+    # 알림: 두 번째 주사위 단계 시작
+    if not game.tournament:
+        embed = discord.Embed(
+            title="🎲 두 번째 주사위 굴리는 중...",
+            color=0x3498DB
+        )
+        await game.channel.send(embed=embed)
         if console_channel:
-            await console_channel.send(f"[{game.tag}] 🎲 <@{uid}> 두 번째 주사위: {roll} (합계 {game_sum})")
+            await console_channel.send(f"[{game.tag}] 🎲 두 번째 주사위 시작")
+    cont = [u for u in game.participants if u not in game.folded]
+    for uid in cont:
+        game.second_rolls[uid] = dice_roll(game.seed, uid, 2)
+    await asyncio.gather(*(send_second_roll(game, uid) for uid in cont), return_exceptions=True)
 
     # Compute pot: sum of all bets minus refunds
     total_bets = game.bet * len(game.participants)
@@ -377,26 +663,36 @@ async def begin_second_roll(game: DiceGame):
     else:
         winners = []
 
+    if game.tournament:
+        # 토너먼트 테이블은 칩 이동 없이 결과만 기록 (상금은 토너먼트 종료 시 한 번에)
+        record_game(game, winners, 0)
+        finish_game(game, winners)
+        return
+
     reward = pot // len(winners) if winners else 0
     # Payout
     for uid in winners:
-        chips = get_user_chips(uid)
-        update_user_chips(uid, chips + reward)
+        add_user_chips(uid, reward, "payout", game.tag)
+    record_game(game, winners, reward)
 
     # Public reveal
     embed = discord.Embed(title=f"🎲 Dice Game 결과 {game.tag}", color=0x00ff00)
     lines = []
+    board = []
     for uid in game.participants:
         init = game.initial_rolls[uid]
         sec  = game.second_rolls.get(uid, None)
         status = "폴드" if uid in game.folded else f"{init} + {sec} = **{init+sec}**"
         mark = "🏆" if uid in winners else ""
-        member = game.join_msg.guild.get_member(uid)
-        name = member.display_name if member else str(uid)
+        name = await member_names.display_name(game.channel.guild, uid)
         lines.append(f"{mark} {name}: {status}")
+        board.append((name, init, sec, uid in game.folded, uid in winners))
     embed.description = "\n".join(lines)
+    png = dice_render.table_board(tuple(board)) if dice_render.available() else None
+    if png:
+        embed.set_image(url="attachment://result.png")
     if winners:
-        win_names = [game.join_msg.guild.get_member(u).display_name for u in winners]
+        win_names = await member_names.many(game.channel.guild, winners)
         embed.add_field(
             name="🎖️우승자",
             value=", ".join(win_names) + f"\n획득 칩: {reward}💰",
@@ -405,16 +701,141 @@ async def begin_second_roll(game: DiceGame):
     else:
         embed.add_field(name="결과", value="모두 폴드하여 우승자가 없습니다.", inline=False)
 
-    await game.channel.send(embed=embed)
+    reveal_footer(embed, game)
+    # discord.File 은 한 번 보내면 소모되므로 채널마다 새로 생성
+    result_file = lambda: discord.File(io.BytesIO(png), filename="result.png") if png else None
+    await game.channel.send(embed=embed, file=result_file())
     # 🛑 모집 뷰(참가/취소 버튼) 제거
     try:
         await game.join_msg.edit(view=None)
     except:
         pass
     if console_channel:
-        await console_channel.send(embed=embed)
+        await console_channel.send(embed=embed, file=result_file())
     # Clean up
-    del active_games[game.channel.id]
+    finish_game(game, winners)
+
+# ─── 6-1) Tournament ──────────────────────────────────────────
+def tournament_embed(t: DiceTournament):
+    embed = discord.Embed(
+        title=f"🏟️ Dice 토너먼트 {t.tag}",
+        description="진행 중입니다…" if t.started else "참가 버튼을 눌러 등록하세요. 주최자가 시작합니다.",
+        color=0xE91E63
+    )
+    embed.add_field(name="👑 주최자",    value=f"<@{t.host}>",                    inline=True)
+    embed.add_field(name="💰 참가비",    value=f"{t.bet}칩",                      inline=True)
+    embed.add_field(name="🪑 테이블",    value=f"최대 {t.table_size}명",           inline=True)
+    embed.add_field(name="👥 참가자",    value=f"{len(t.players)}명",             inline=True)
+    embed.add_field(name="🏆 총 상금",   value=f"{t.bet * len(t.players)}칩",     inline=True)
+    return embed
+
+async def send_embeds(channel, title, lines, color, footer=None):
+    # 테이블이 많으면 설명 한도(4096자)를 넘으므로 줄 단위로 나눠 여러 embed 로 보냄
+    chunks, cur = [], ""
+    for line in lines:
+        if cur and len(cur) + len(line) + 1 > 4000:
+            chunks.append(cur)
+            cur = ""
+        cur = f"{cur}\n{line}" if cur else line
+    chunks.append(cur)
+    embeds = [discord.Embed(title=title, description=c, color=color) for c in chunks]
+    if footer:
+        embeds[-1].set_footer(text=footer)
+    for embed in embeds:
+        await channel.send(embed=embed)
+    return embeds
+
+def seat_tables(players, table_size: int):
+    # 무작위로 섞은 뒤 라운드 로빈으로 배정 → 테이블 인원 차이는 최대 1명
+    seats = list(players)
+    secrets.SystemRandom().shuffle(seats)
+    n_tables = -(-len(seats) // table_size)
+    return [seats[i::n_tables] for i in range(n_tables)]
+
+async def play_round(t: DiceTournament, rnd: int, alive):
+    loop = asyncio.get_running_loop()
+    games, advanced = [], []
+    for i, uids in enumerate(seat_tables(alive, t.table_size), start=1):
+        if len(uids) == 1:
+            advanced.extend(uids)   # 부전승
+            continue
+        game = DiceGame(t.channel, 0, len(uids))
+        game.tag = f"{t.tag}-R{rnd}-{i:02d}"
+        game.host = t.host
+        game.participants = uids
+        game.tournament = t
+        game.done = loop.create_future()
+        games.append(game)
+
+    # 테이블별 seed hash 를 굴리기 전에 채널에 공개 (commit), 라운드가 끝나면 seed 공개 (reveal)
+    await send_embeds(t.channel, f"🏟️ {t.tag} 라운드 {rnd}", [
+        f"{len(alive)}명 · 테이블 {len(games)}개 동시 진행",
+        f"DM 으로 첫 주사위를 확인하고 {TOURNAMENT_ROLL_TIMEOUT}초 안에 선택하세요.",
+        "",
+        *(f"`{game.tag}` 🔒 `{seed_hash(game.seed)}`" for game in games)
+    ], 0x3498DB)
+    # 모든 테이블을 한 번에 시작하고, 각 테이블의 승자 future 를 기다림
+    for game in games:
+        loop.create_task(begin_first_roll(game))
+        loop.create_task(first_roll_timeout(game, TOURNAMENT_ROLL_TIMEOUT))
+    results = await asyncio.gather(*(game.done for game in games))
+
+    lines = []
+    for game, winners in zip(games, results):
+        advanced.extend(winners)
+        lines.append(
+            f"`{game.tag}` " + (" ".join(f"<@{u}>" for u in winners) or "진출자 없음")
+            + f"\n└ 🔓 `{game.seed}`"
+        )
+    summary = await send_embeds(
+        t.channel, f"🏟️ {t.tag} 라운드 {rnd} 결과", lines, 0x2ECC71,
+        footer=f"진출 {len(advanced)}명"
+    )
+    if console_channel:
+        for embed in summary:
+            await console_channel.send(embed=embed)
+    return advanced
+
+async def run_tournament(t: DiceTournament):
+    settling = False
+    try:
+        alive, rnd = list(t.players), 0
+        # 동점자는 함께 진출하므로 라운드 수 상한을 둠
+        while len(alive) > 1 and rnd < TOURNAMENT_MAX_ROUNDS:
+            rnd += 1
+            alive = await play_round(t, rnd, alive)
+
+        pot = t.bet * len(t.players)
+        settling = True
+        if not alive:
+            # 진출자가 아무도 없으면 참가비 전액 환급
+            for uid in t.players:
+                add_user_chips(uid, t.bet, "refund", t.tag)
+            desc = "남은 참가자가 없어 참가비가 전액 환급되었습니다."
+        else:
+            prize = pot // len(alive)
+            for uid in alive:
+                add_user_chips(uid, prize, "tournament_prize", t.tag)
+            desc = (
+                " ".join(f"<@{u}>" for u in alive)
+                + f"\n🏆 상금: 1인당 {prize}칩 (총 {pot}칩, {rnd}라운드)"
+            )
+        embed = discord.Embed(title=f"🏟️ {t.tag} 토너먼트 종료", description=desc, color=0xF1C40F)
+        await t.channel.send(embed=embed)
+        if console_channel:
+            await console_channel.send(embed=embed)
+    except Exception:
+        # 정산 전에 실패하면 참가비 전액 환급 (정산 도중 실패는 이중 지급 위험이 있어 원장으로 확인)
+        if not settling:
+            for uid in t.players:
+                add_user_chips(uid, t.bet, "refund", t.tag)
+            try:
+                await t.channel.send(f"⚠️ {t.tag} 토너먼트 진행 중 오류가 발생해 참가비가 전액 환급되었습니다.")
+            except discord.HTTPException:
+                pass
+        raise
+    finally:
+        active_tournaments.pop(t.channel.id, None)
 
 # ─── 7) /dice 명령어 ───────────────────────────────────────────
 @tree.command(
@@ -427,6 +848,7 @@ async def begin_second_roll(game: DiceGame):
     bet="베팅할 칩 수",
     players="참가 인원 수 (2~10)"
 )
+@rate_limited("command")
 async def dice_cmd(inter: discord.Interaction, bet: int, players: int):
     if players < MIN_PLAYERS or players > MAX_PLAYERS:
         return await inter.response.send_message(
@@ -445,10 +867,11 @@ async def dice_cmd(inter: discord.Interaction, bet: int, players: int):
     host_id = inter.user.id
     game.host = host_id
     # 주최자 베팅 금액 즉시 차감
-    host_chips = get_user_chips(host_id)
-    update_user_chips(host_id, host_chips - bet)
-    game.participants.append(host_id)
     game.tag = f"#{game_counter:04d}"
+    get_user_chips(host_id)
+    if not try_debit(host_id, bet, "bet", game.tag):
+        return await inter.response.send_message("🛑 잔액이 부족합니다.", ephemeral=True)
+    game.participants.append(host_id)
     active_games[inter.channel.id] = game
 
     # 역할 멘션이 필요하면 content에 추가
@@ -463,6 +886,7 @@ async def dice_cmd(inter: discord.Interaction, bet: int, players: int):
     embed.add_field(name="💰 베팅액",    value=f"{bet}칩",                   inline=True)
     embed.add_field(name="👤 참가자",    value="없음" if len(game.participants)==0 else f"<@{host_id}>", inline=True)
     embed.add_field(name="👥 목표 인원", value=f"1/{players}명",               inline=True)
+    commit_footer(embed, game)
 
     # 콘솔에 게임 시작 로그
     if console_channel:
@@ -492,6 +916,7 @@ async def dice_cmd(inter: discord.Interaction, bet: int, players: int):
     guild=test_guild
 )
 @in_command_channel()
+@rate_limited("command")
 async def quit_cmd(inter: discord.Interaction):
     channel_id = inter.channel.id
     if channel_id not in active_games:
@@ -526,11 +951,200 @@ async def quit_cmd(inter: discord.Interaction):
             bot.loop.create_task(begin_second_roll(game))
 
 
+@tree.command(
+    name="tournament",
+    description="여러 테이블을 동시에 돌리는 Dice 토너먼트 모집",
+    guild=test_guild
+)
+@in_command_channel()
+@app_commands.describe(
+    bet="참가비 (우승자가 총액을 나눠 가짐)",
+    table_size="테이블당 최대 인원 (2~10)"
+)
+@rate_limited("command")
+async def tournament_cmd(inter: discord.Interaction, bet: int, table_size: int = MAX_PLAYERS):
+    if table_size < MIN_PLAYERS or table_size > MAX_PLAYERS:
+        return await inter.response.send_message(
+            f"❌ 테이블 인원은 {MIN_PLAYERS}명 이상, {MAX_PLAYERS}명 이하만 가능합니다.",
+            ephemeral=True
+        )
+    if bet <= 0:
+        return await inter.response.send_message("❌ 올바른 참가비를 입력하세요.", ephemeral=True)
+    if inter.channel.id in active_tournaments:
+        return await inter.response.send_message("❌ 이 채널에서 이미 토너먼트가 진행 중입니다.", ephemeral=True)
+
+    host_id = inter.user.id
+    async with user_lock(host_id):
+        get_user_chips(host_id)
+        global tournament_counter
+        t = DiceTournament(inter.channel, bet, table_size, host_id)
+        t.tag = f"T{tournament_counter + 1:03d}"
+        # 주최자 자동 참가
+        if not try_debit(host_id, bet, "tournament_entry", t.tag):
+            return await inter.response.send_message("🛑 잔액이 부족합니다.", ephemeral=True)
+        tournament_counter += 1
+        t.players.append(host_id)
+    active_tournaments[inter.channel.id] = t
+
+    if console_channel:
+        await console_channel.send(
+            f"[{t.tag}] 🏟️ 토너먼트 모집 시작 — 주최자 <@{host_id}>, 참가비 {bet}칩, 테이블 {table_size}명"
+        )
+    await inter.response.send_message(embed=tournament_embed(t), view=TournamentView(t))
+    t.msg = await inter.original_response()
+    bot.loop.create_task(tournament_join_timeout(t))
+
+async def tournament_join_timeout(t: DiceTournament, delay: int = TOURNAMENT_JOIN_TIMEOUT):
+    await asyncio.sleep(delay)
+    # 이미 시작했거나 주최자가 취소했으면 패스 (둘 다 started 를 세움)
+    if t.started:
+        return
+    t.started = True
+    for uid in t.players:
+        add_user_chips(uid, t.bet, "refund", t.tag)
+    if active_tournaments.get(t.channel.id) is t:
+        del active_tournaments[t.channel.id]
+    try:
+        await t.msg.edit(
+            embed=discord.Embed(
+                title=f"{t.tag} 토너먼트 취소됨",
+                description=f"{delay // 60}분 안에 시작되지 않아 취소되었습니다. 참가비는 전액 환급되었습니다.",
+                color=0xff0000
+            ),
+            view=None
+        )
+    except discord.HTTPException:
+        pass
+    if console_channel:
+        await console_channel.send(f"[{t.tag}] ⏰ 모집 시간 초과로 토너먼트 취소 ({len(t.players)}명 환급)")
+
 
-async def first_roll_timeout(game: DiceGame):
-    await asyncio.sleep(300)  # 5분
+
+DICE_OUTCOMES = {"win":"🏆승리", "lose":"💀패배", "fold":"💤폴드"}
+
+def fmt_dice_row(r):
+    _,ts,tag,bet,payout,outcome,_,_,_,_,rolls = r
+    return (f"`{tag}` <t:{ts}:d> 🎲 {rolls or '-'} | "
+            f"🪙{bet} → {payout} ({DICE_OUTCOMES.get(outcome,outcome)})")
+
+@tree.command(
+    name="history",
+    description="내 Dice 게임 기록",
+    guild=test_guild
+)
+@rate_limited("command")
+async def history_cmd(inter: discord.Interaction):
+    view = HistoryView(history, inter.user.id, fmt_dice_row, "📜 Dice 기록")
+    await inter.response.send_message(embed=view.build_embed(), view=view, ephemeral=True)
+
+
+@tree.command(
+    name="gameinfo",
+    description="게임 태그로 기록 조회 (관리자 전용)",
+    guild=admin_guild
+)
+@app_commands.describe(tag="게임 태그 (예: #0042)")
+@app_commands.checks.has_permissions(administrator=True)
+async def gameinfo_cmd(inter: discord.Interaction, tag: str):
+    rows = history.by_tag(tag)
+    if not rows:
+        return await inter.response.send_message(f"❌ `{tag}` 기록이 없습니다.", ephemeral=True)
+    embed = discord.Embed(title=f"🎲 {tag}", color=0x00BFFF)
+    embed.description = "\n".join(f"<@{uid}> {fmt_dice_row(r)}" for uid, *r in rows)
+    await inter.response.send_message(embed=embed, ephemeral=True)
+
+
+@tree.command(
+    name="backup",
+    description="DB 온라인 백업 (관리자 전용)",
+    guild=admin_guild
+)
+@app_commands.describe(compact="백업 후 빈 페이지 정리 + WAL 체크포인트")
+@app_commands.checks.has_permissions(administrator=True)
+async def backup_cmd(inter: discord.Interaction, compact: bool = False):
+    await inter.response.defer(ephemeral=True)
+    dest = await run_backup(compact=compact)
+    await inter.followup.send(f"✅ 백업 완료: `{dest}`", ephemeral=True)
+
+
+@tree.command(
+    name="ratestats",
+    description="rate limit 통계 (관리자 전용)",
+    guild=admin_guild
+)
+@app_commands.checks.has_permissions(administrator=True)
+async def ratestats_cmd(inter: discord.Interaction):
+    await inter.response.send_message(embed=stats_embed(), ephemeral=True)
+
+
+@tree.error
+async def on_tree_error(inter: discord.Interaction, error):
+    if isinstance(error, RateLimited):
+        return await reject(inter)
+    if isinstance(error, WrongChannel):
+        return await inter.response.send_message(str(error), ephemeral=True)
+    await app_commands.CommandTree.on_error(tree, inter, error)
+
+
+@tree.command(
+    name="sync",
+    description="명령어 트리 강제 sync (관리자 전용)",
+    guild=admin_guild
+)
+@app_commands.checks.has_permissions(administrator=True)
+async def sync_cmd(inter: discord.Interaction):
+    await inter.response.defer(ephemeral=True)
+    for scope in SYNC_SCOPES:
+        await sync_if_changed(tree, scope, TREE_HASH_PATH, force=True)
+    await inter.followup.send("✅ 명령어 트리를 sync 했습니다.", ephemeral=True)
+
+
+@tree.command(
+    name="setchannel",
+    description="이 서버에서 게임 명령어를 쓸 채널 지정 (서버 관리자)",
+    guild=test_guild
+)
+@app_commands.describe(channel="비워 두면 제한 해제")
+@app_commands.guild_only()
+@app_commands.checks.has_permissions(administrator=True)
+async def setchannel_cmd(inter: discord.Interaction, channel: discord.TextChannel = None):
+    guild_config.set_channel(inter.guild_id, channel.id if channel else None)
+    msg = f"✅ 게임 채널: {channel.mention}" if channel else "✅ 게임 채널 제한을 해제했습니다."
+    await inter.response.send_message(msg, ephemeral=True)
+
+
+@tree.command(
+    name="profile",
+    description="샘플링 프로파일 (관리자 전용)",
+    guild=admin_guild
+)
+@app_commands.describe(seconds="측정 시간 (초)")
+@app_commands.checks.has_permissions(administrator=True)
+async def profile_cmd(inter: discord.Interaction, seconds: app_commands.Range[int, 5, MAX_WINDOW] = DEFAULT_WINDOW):
+    if profiler.running:
+        return await inter.response.send_message("⏳ 이미 프로파일링 중입니다.", ephemeral=True)
+    await inter.response.defer(ephemeral=True)
+    summary, paths = await profiler.run(seconds, "dice")
+    embed = discord.Embed(title="📈 Profile", description=f"```\n{summary[:4000]}\n```", color=0x95A5A6)
+    await inter.followup.send(embed=embed, files=[discord.File(p) for p in paths], ephemeral=True)
+
+
+@setchannel_cmd.error
+@profile_cmd.error
+@sync_cmd.error
+@ratestats_cmd.error
+@backup_cmd.error
+@gameinfo_cmd.error
+async def admin_error(inter: discord.Interaction, error):
+    if isinstance(error, app_commands.MissingPermissions):
+        await inter.response.send_message("❌ 관리자 권한이 필요합니다.", ephemeral=True)
+
+
+
+async def first_roll_timeout(game: DiceGame, delay: int = 300):
+    await asyncio.sleep(delay)  # 기본 5분
     # 이미 해제됐거나 끝난 게임이면 패스
-    if game.channel.id not in active_games:
+    if game.resolving or (not game.tournament and active_games.get(game.channel.id) is not game):
         return
     # 응답 안 한 사람들은 전부 탈락
     to_remove = [u for u in game.participants if u not in game.responded]
@@ -538,9 +1152,10 @@ async def first_roll_timeout(game: DiceGame):
         game.folded.add(uid)
         game.responded.add(uid)
     # 안내 메시지
-    await game.channel.send(
-        f"⏰ 5분 경과로 응답 없는 유저 {len(to_remove)}명 탈락 처리되었습니다."
-    )
+    if not game.tournament:
+        await game.channel.send(
+            f"⏰ {delay // 60}분 경과로 응답 없는 유저 {len(to_remove)}명 탈락 처리되었습니다."
+        )
     # 진행
     remaining = [u for u in game.participants if u not in game.folded]
     if len(remaining) == 1:
@@ -551,11 +1166,26 @@ async def first_roll_timeout(game: DiceGame):
 
 
 # ─── 8) Bot start ──────────────────────────────────────────────
+TREE_HASH_PATH = DB_PATH + ".treehash"
+startup_done   = False
+
 @bot.event
 async def on_ready():
     print(f"✅ Logged in as {bot.user}")
-    global console_channel
-    console_channel = bot.get_channel(CONSOLE_CHANNEL_ID)
-    await tree.sync(guild=test_guild)
+    global console_channel, startup_done
+    # 운영 서버가 다른 샤드(프로세스)에 있어도 id 만으로 보낼 수 있게
+    if CONSOLE_CHANNEL_ID:
+        console_channel = bot.get_channel(CONSOLE_CHANNEL_ID) or bot.get_partial_messageable(CONSOLE_CHANNEL_ID)
+    # 재접속 시 on_ready 가 다시 불려도 시작 작업은 한 번만
+    if startup_done:
+        return
+    startup_done = True
+    flush_buffers.start()
+    # kill -USR1 <pid> 로도 프로파일 (콘솔에 요약 출력)
+    install_signal_handler(bot.loop, "dice")
+    backup_loop.start()
+    for scope in SYNC_SCOPES:
+        if await sync_if_changed(tree, scope, TREE_HASH_PATH):
+            print(f"🔄 command tree synced ({scope.id if scope else 'global'})")
 
 bot.run(DISCORD_TOKEN)
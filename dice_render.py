@@ -0,0 +1,86 @@
+import io
+import os
+from functools import lru_cache
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:   # Pillow 없으면 기존 텍스트/개별 이미지 DM 으로 동작
+    Image = None
+
+# 주사위 결과 합성 이미지
+# - roll_pair: 첫 번째 + 두 번째 = 합계 를 한 장으로 (20×20 = 400 조합 전부 LRU 캐시)
+# - table_board: 테이블 전체 결과표 (채널 공개용)
+NUMBERS_FOLDER = os.path.join(os.getcwd(), "numbers")
+FONT_FILE      = os.path.join(os.getcwd(), "font.ttf")   # 한글 닉네임용 (없으면 기본 폰트)
+TILE  = 128
+ROW_H = 40
+BG    = (47, 49, 54, 255)
+FG    = (220, 221, 222)
+
+def available() -> bool:
+    return Image is not None
+
+@lru_cache(maxsize=8)
+def _font(size: int):
+    if os.path.isfile(FONT_FILE):
+        return ImageFont.truetype(FONT_FILE, size)
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:   # Pillow < 10.1
+        return ImageFont.load_default()
+
+def _text_tile(text: str, fill):
+    img = Image.new("RGBA", (TILE, TILE), (0, 0, 0, 0))
+    d = ImageDraw.Draw(img)
+    d.rounded_rectangle([4, 4, TILE-5, TILE-5], radius=18, fill=fill)
+    d.text((TILE//2, TILE//2), text, fill=(255, 255, 255), font=_font(56), anchor="mm")
+    return img
+
+@lru_cache(maxsize=20)
+def _roll_tile(n: int):
+    # numbers/ 폴더 이미지가 있으면 그걸 쓰고, 없으면 직접 그림
+    path = os.path.join(NUMBERS_FOLDER, f"{n}.png")
+    if os.path.isfile(path):
+        return Image.open(path).convert("RGBA").resize((TILE, TILE))
+    return _text_tile(str(n), (52, 152, 219))
+
+@lru_cache(maxsize=39)
+def _sum_tile(n: int):
+    return _text_tile(str(n), (155, 89, 182))
+
+def _png(img) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+@lru_cache(maxsize=400)
+def roll_pair(first: int, second: int) -> bytes:
+    gap = 48
+    img = Image.new("RGBA", (TILE*3 + gap*2, TILE), BG)
+    d = ImageDraw.Draw(img)
+    for i, tile in enumerate((_roll_tile(first), _roll_tile(second), _sum_tile(first + second))):
+        img.paste(tile, (i*(TILE+gap), 0), tile)
+    for i, op in enumerate("+="):
+        d.text(((i+1)*(TILE+gap) - gap//2, TILE//2), op, fill=FG, font=_font(40), anchor="mm")
+    return _png(img)
+
+@lru_cache(maxsize=64)
+def table_board(rows) -> bytes:
+    # rows: ((name, first, second 또는 None, folded, winner), ...) — 해시 가능해야 캐시됨
+    width = 520
+    img = Image.new("RGBA", (width, ROW_H * (len(rows) + 1)), BG)
+    d = ImageDraw.Draw(img)
+    font = _font(20)
+    for x, head in ((12, "PLAYER"), (280, "1st"), (340, "2nd"), (420, "SUM")):
+        d.text((x, ROW_H//2), head, fill=(150, 150, 150), font=font, anchor="lm")
+    for i, (name, first, second, folded, winner) in enumerate(rows, start=1):
+        y = i*ROW_H + ROW_H//2
+        if winner:
+            d.rectangle([0, i*ROW_H, width, (i+1)*ROW_H - 1], fill=(92, 78, 24, 255))
+        color = (120, 120, 120) if folded else FG
+        d.text((12, y), name[:20], fill=color, font=font, anchor="lm")
+        d.text((280, y), str(first) if first is not None else "-", fill=color, font=font, anchor="lm")
+        d.text((340, y), "FOLD" if folded else (str(second) if second is not None else "-"), fill=color, font=font, anchor="lm")
+        if not folded and second is not None:
+            d.text((420, y), str(first + second), fill=color, font=font, anchor="lm")
+    return _png(img)
@@ -0,0 +1,48 @@
+import hmac
+import hashlib
+import secrets
+
+# Provably-fair RNG (commit-reveal)
+# - 게임 시작 시 server seed 의 sha256 을 공개하고, 끝나면 seed 자체를 공개
+# - 결과는 HMAC-SHA256(seed, 메시지) 로만 결정되므로 누구나 다시 계산해 검증 가능
+# - 전역 random 상태와 무관, 판당 HMAC 몇 번이면 끝나서 hot path 에서도 가벼움
+
+def new_server_seed() -> str:
+    return secrets.token_hex(32)
+
+def seed_hash(seed: str) -> str:
+    return hashlib.sha256(seed.encode()).hexdigest()
+
+def _uint32_stream(seed: str, msg: str):
+    # HMAC(seed, "msg:counter") 블록을 4바이트씩 잘라 무한히 공급
+    key = seed.encode()
+    counter = 0
+    while True:
+        block = hmac.digest(key, f"{msg}:{counter}".encode(), "sha256")
+        for i in range(0, 32, 4):
+            yield int.from_bytes(block[i:i+4], "big")
+        counter += 1
+
+def _uniform(stream, n: int) -> int:
+    # [0, n) 균등 정수: 나머지 편향이 생기는 구간은 버림 (rejection sampling)
+    limit = (1 << 32) - (1 << 32) % n
+    while True:
+        v = next(stream)
+        if v < limit:
+            return v % n
+
+def mines_board(seed: str, uid, tag: str, size: int, mines: int) -> int:
+    # 부분 Fisher-Yates 로 (y*size+x) 칸 중 mines 개 선택 → 비트마스크
+    cells  = list(range(size*size))
+    stream = _uint32_stream(seed, f"mines:{uid}:{tag}")
+    for i in range(mines):
+        j = i + _uniform(stream, len(cells) - i)
+        cells[i], cells[j] = cells[j], cells[i]
+    mask = 0
+    for c in cells[:mines]:
+        mask |= 1 << c
+    return mask
+
+def dice_roll(seed: str, uid, n: int) -> int:
+    # n번째 주사위 (1~20)
+    return 1 + _uniform(_uint32_stream(seed, f"dice:{uid}:{n}"), 20)
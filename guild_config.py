@@ -0,0 +1,52 @@
+from discord import app_commands
+
+# 길드별 설정: config(guild_id, channel_id) 테이블
+# - 시작 시 한 번 읽어 dict 로 들고 있고, 바뀔 때만 DB 에 씀
+# - 길드는 한 샤드(프로세스)에서만 처리되므로 프로세스별 캐시가 어긋나지 않음
+class WrongChannel(app_commands.CheckFailure):
+    pass
+
+class GuildConfig:
+    def __init__(self, conn):
+        self.conn = conn
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS config (
+          guild_id TEXT PRIMARY KEY,
+          channel_id TEXT
+        )
+        """)
+        conn.commit()
+        self.channels = {
+            int(gid): int(cid) if cid else None
+            for gid, cid in conn.execute("SELECT guild_id, channel_id FROM config")
+        }
+
+    def channel(self, guild_id):
+        return self.channels.get(guild_id)
+
+    def set_channel(self, guild_id: int, channel_id):
+        self.conn.execute(
+            "INSERT INTO config(guild_id, channel_id) VALUES(?, ?) "
+            "ON CONFLICT(guild_id) DO UPDATE SET channel_id = excluded.channel_id",
+            (str(guild_id), str(channel_id) if channel_id else None)
+        )
+        self.conn.commit()
+        self.channels[guild_id] = channel_id
+
+    def setdefault_channel(self, guild_id, channel_id):
+        # keys.json 의 단일 서버 설정을 테이블로 옮겨 올 때 (이미 있으면 그대로)
+        if guild_id and channel_id and guild_id not in self.channels:
+            self.set_channel(guild_id, channel_id)
+
+    def check(self, allow_dm: bool = False):
+        # 설정된 채널이 있는 길드에서는 그 채널에서만, 없으면 어디서나
+        def predicate(inter) -> bool:
+            if inter.guild_id is None:
+                if allow_dm:
+                    return True
+                raise WrongChannel("❌ 이 명령어는 서버 채널에서만 사용할 수 있습니다.")
+            allowed = self.channels.get(inter.guild_id)
+            if allowed and inter.channel_id != allowed:
+                raise WrongChannel(f"❌ 이 명령어는 <#{allowed}> 채널에서만 사용할 수 있습니다.")
+            return True
+        return app_commands.check(predicate)
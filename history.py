@@ -0,0 +1,127 @@
+import time
+import sqlite3
+
+import discord
+from discord.ui import Button
+
+from ratelimit import RateLimitedView
+
+# 게임 기록 (유저별 1판 1행)
+# - record() 는 버퍼에 쌓고 flush() 때 executemany 로 한 번에 INSERT
+# - /history 는 (user_id, ts, id) keyset 페이지네이션, 태그 조회는 tag 인덱스 사용
+FLUSH_SIZE = 50
+PAGE_SIZE  = 10
+
+COLUMNS = "id,ts,tag,bet,payout,outcome,multiplier,size,mines,board,rolls"
+
+class GameHistory:
+    def __init__(self, conn, game: str):
+        self.conn   = conn
+        self.game   = game
+        self.buffer = []
+        cur = conn.cursor()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS games (
+            id         INTEGER PRIMARY KEY,
+            user_id    TEXT    NOT NULL,
+            game       TEXT    NOT NULL,
+            tag        TEXT,
+            ts         INTEGER NOT NULL,
+            bet        INTEGER NOT NULL,
+            payout     INTEGER NOT NULL,
+            outcome    TEXT    NOT NULL,
+            multiplier REAL,
+            size       INTEGER,
+            mines      INTEGER,
+            board      TEXT,
+            rolls      TEXT,
+            seed       TEXT
+        )
+        """)
+        try:
+            cur.execute("ALTER TABLE games ADD COLUMN seed TEXT")
+        except sqlite3.OperationalError:
+            pass
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_games_user ON games(user_id, ts)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_games_tag ON games(tag)")
+        conn.commit()
+
+    def record(self, uid, tag, bet, payout, outcome,
+               multiplier=None, size=None, mines=None, board=None, rolls=None, seed=None):
+        self.buffer.append((
+            str(uid), self.game, tag, int(time.time()), bet, payout, outcome,
+            multiplier, size, mines, board, rolls, seed
+        ))
+        if len(self.buffer) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        # 커밋이 끝난 뒤에만 버퍼를 비움 (seed 가 든 기록을 잃지 않도록)
+        try:
+            self.conn.executemany(
+                "INSERT INTO games(user_id,game,tag,ts,bet,payout,outcome,multiplier,size,mines,board,rolls,seed) "
+                "VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                self.buffer
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.buffer = []
+
+    def max_id(self) -> int:
+        self.flush()
+        return self.conn.execute("SELECT COALESCE(MAX(id),0) FROM games").fetchone()[0]
+
+    def page(self, uid, before=None, limit=PAGE_SIZE):
+        # before = 이전 페이지 마지막 행의 (ts, id); OFFSET 없이 인덱스에서 바로 이어 읽음
+        self.flush()
+        if before is None:
+            return self.conn.execute(
+                f"SELECT {COLUMNS} FROM games WHERE user_id=? "
+                "ORDER BY ts DESC, id DESC LIMIT ?",
+                (str(uid), limit)
+            ).fetchall()
+        return self.conn.execute(
+            f"SELECT {COLUMNS} FROM games WHERE user_id=? AND (ts,id) < (?,?) "
+            "ORDER BY ts DESC, id DESC LIMIT ?",
+            (str(uid), before[0], before[1], limit)
+        ).fetchall()
+
+    def by_tag(self, tag):
+        self.flush()
+        return self.conn.execute(
+            f"SELECT user_id,{COLUMNS} FROM games WHERE tag=? ORDER BY id",
+            (tag,)
+        ).fetchall()
+
+class HistoryView(RateLimitedView):
+    # fmt(row) -> 한 줄 문자열; 다음 페이지는 마지막 행의 (ts, id) 커서로 조회
+    action = "menu"
+
+    def __init__(self, history: GameHistory, uid: int, fmt, title: str):
+        super().__init__(timeout=120)
+        self.history, self.uid, self.fmt, self.title = history, uid, fmt, title
+        self.page_no = 1
+        self.rows    = history.page(uid)
+
+    def build_embed(self):
+        embed = discord.Embed(title=f"{self.title} ({self.page_no}페이지)", color=0x3498DB)
+        embed.description = "\n".join(self.fmt(r) for r in self.rows) or "기록이 없습니다."
+        self.next.disabled = len(self.rows) < PAGE_SIZE
+        return embed
+
+    @discord.ui.button(label="다음 ▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: Button):
+        if interaction.user.id != self.uid:
+            return await interaction.response.send_message("❗ 당신만 사용할 수 있습니다.", ephemeral=True)
+        last = self.rows[-1]
+        rows = self.history.page(self.uid, before=(last[1], last[0]))
+        if not rows:
+            button.disabled = True
+            return await interaction.response.edit_message(view=self)
+        self.rows = rows
+        self.page_no += 1
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
@@ -0,0 +1,91 @@
+import time
+
+# 칩 거래 원장 (append-only)
+# - 모든 지갑 변동은 record() 로 버퍼에 쌓였다가 flush() 때 executemany 로 한 번에 INSERT
+# - snapshot() 은 그 시점 users.chips 와 마지막 거래 id 를 저장해서
+#   잔액 재구성 시 스냅샷 이후 거래만 더하면 되도록 함
+FLUSH_SIZE        = 50
+SNAPSHOT_INTERVAL = 600   # 초
+
+class Ledger:
+    def __init__(self, conn, game: str, flush_size: int = FLUSH_SIZE, snapshots: bool = True):
+        self.conn   = conn
+        self.game   = game
+        self.buffer = []
+        self.flush_size = flush_size
+        self.snapshots  = snapshots
+        self.last_snapshot = 0.0
+        cur = conn.cursor()
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id      INTEGER PRIMARY KEY,
+            user_id TEXT    NOT NULL,
+            game    TEXT    NOT NULL,
+            tag     TEXT,
+            delta   INTEGER NOT NULL,
+            reason  TEXT    NOT NULL,
+            ts      INTEGER NOT NULL
+        )
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tx_user ON transactions(user_id, ts)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_tx_game ON transactions(game, tag)")
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS balance_snapshots (
+            user_id TEXT    PRIMARY KEY,
+            chips   INTEGER NOT NULL,
+            tx_id   INTEGER NOT NULL,
+            ts      INTEGER NOT NULL
+        )
+        """)
+        conn.commit()
+
+    def record(self, uid, delta: int, reason: str, tag=None):
+        self.buffer.append((str(uid), self.game, tag, delta, reason, int(time.time())))
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if not self.buffer:
+            return
+        # 커밋이 끝난 뒤에만 버퍼를 비움: 실패하면 되돌리고 다음 flush 에서 다시 시도
+        try:
+            self.conn.executemany(
+                "INSERT INTO transactions(user_id,game,tag,delta,reason,ts) VALUES(?,?,?,?,?,?)",
+                self.buffer
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.buffer = []
+
+    def snapshot(self):
+        # 버퍼를 먼저 비워야 chips 와 tx_id 가 같은 시점을 가리킴
+        self.flush()
+        tx_id = self.conn.execute("SELECT COALESCE(MAX(id),0) FROM transactions").fetchone()[0]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO balance_snapshots(user_id,chips,tx_id,ts) "
+            "SELECT user_id, chips, ?, ? FROM users",
+            (tx_id, int(time.time()))
+        )
+        self.conn.commit()
+        self.last_snapshot = time.monotonic()
+
+    def tick(self):
+        # 주기 작업에서 호출: flush + 필요하면 스냅샷
+        if self.snapshots and time.monotonic() - self.last_snapshot >= SNAPSHOT_INTERVAL:
+            self.snapshot()
+        else:
+            self.flush()
+
+    def rebuild_balance(self, uid) -> int:
+        self.flush()
+        row = self.conn.execute(
+            "SELECT chips, tx_id FROM balance_snapshots WHERE user_id=?", (str(uid),)
+        ).fetchone()
+        base, after = row if row else (0, 0)
+        delta = self.conn.execute(
+            "SELECT COALESCE(SUM(delta),0) FROM transactions WHERE user_id=? AND id>?",
+            (str(uid), after)
+        ).fetchone()[0]
+        return base + delta
@@ -1,13 +1,31 @@
+import io
 import os
 import json
-import random
+import time
+import asyncio
 import sqlite3
+from bisect import bisect_right
+from datetime import date, timedelta
 from collections import defaultdict
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-from discord.ui import View, Button, Select, Modal, TextInput
+from discord.ui import Button, Select, Modal, TextInput
+
+from userlock import user_lock
+from config_cache import load_json
+from member_cache import MemberNames, lean_client_options
+from tree_sync import sync_if_changed
+from guild_config import GuildConfig, WrongChannel
+from profiling import profiler, install_signal_handler, DEFAULT_WINDOW, MAX_WINDOW
+from sharding import DB_TIMEOUT, shard_options, multi_process, is_primary, tag_suffix, ledger_options
+from ratelimit import rate_limited, RateLimited, RateLimitedView, reject, stats_embed
+from ledger import Ledger
+from db_backup import enable_online_maintenance, backup_db, compact_db
+from history import GameHistory, HistoryView
+from fair_rng import new_server_seed, seed_hash, mines_board
+import board_render
 
 # ─── 1) Load config ─────────────────────────────────────────────
 with open("keys.json", "r") as f:
@@ -15,11 +33,21 @@ with open("keys.json", "r") as f:
 
 DISCORD_TOKEN = config["discord_bot_token"]
 GUILD_ID      = config.get("guild_id", 1263856763762118727)
-test_guild    = discord.Object(id=GUILD_ID)
+GLOBAL_COMMANDS = config.get("global_commands", False)
+# 관리자 명령어는 항상 운영 서버에만, 일반 명령어는 global_commands 면 전역 등록
+admin_guild   = discord.Object(id=GUILD_ID)
+test_guild    = None if GLOBAL_COMMANDS else admin_guild
+SYNC_SCOPES   = [test_guild] if test_guild is admin_guild else [test_guild, admin_guild]
+PRIMARY       = is_primary(config)
+TAG_SUFFIX    = tag_suffix(config)
+BACKUP_INTERVAL_H = config.get("backup_interval_hours", 6)
+LEAN_MODE     = config.get("lean_mode", False)
 
 # ─── 2) SQLite setup ────────────────────────────────────────────
-conn   = sqlite3.connect("mines_game.db")
+DB_PATH = "mines_game.db"
+conn   = sqlite3.connect(DB_PATH, timeout=DB_TIMEOUT)
 cursor = conn.cursor()
+enable_online_maintenance(conn)
 cursor.execute("""
 CREATE TABLE IF NOT EXISTS users (
     user_id       TEXT PRIMARY KEY,
@@ -33,13 +61,53 @@ CREATE TABLE IF NOT EXISTS users (
 """)
 for col, default in (
     ("wins",0), ("losses",0),
-    ("default_size",3), ("default_mines",3)
+    ("default_size",3), ("default_mines",3),
+    ("attend_streak",0), ("invites",0), ("invites_last_claim",0)
 ):
     try:
         cursor.execute(f"ALTER TABLE users ADD COLUMN {col} INTEGER DEFAULT {default}")
     except sqlite3.OperationalError:
         pass
+try:
+    cursor.execute("ALTER TABLE users ADD COLUMN last_attendance TEXT DEFAULT ''")
+except sqlite3.OperationalError:
+    pass
+# 랭킹 구체화 테이블: (sort_key, rank) 로 keyset 페이지네이션
+# 게임 DB 와 별도 파일에 두어, 재계산 중 쓰기 잠금이 게임 쪽 쓰기를 막지 않게 함
+RANK_DB_PATH = "mines_rank.db"
+LEADERBOARD_DDL = """
+CREATE TABLE IF NOT EXISTS lb.{name} (
+    sort_key TEXT    NOT NULL,
+    rank     INTEGER NOT NULL,
+    user_id  TEXT    NOT NULL,
+    score    REAL    NOT NULL,
+    chips    INTEGER NOT NULL,
+    wins     INTEGER NOT NULL,
+    losses   INTEGER NOT NULL,
+    PRIMARY KEY (sort_key, rank)
+) WITHOUT ROWID
+"""
+cursor.execute("ATTACH DATABASE ? AS lb", (RANK_DB_PATH,))
+cursor.execute("PRAGMA lb.journal_mode=WAL")
+cursor.execute(LEADERBOARD_DDL.format(name="leaderboard"))
 conn.commit()
+ledger  = Ledger(conn, "mines", **ledger_options(config))
+history = GameHistory(conn, "mines")
+guild_config = GuildConfig(conn)
+
+def last_tag_number() -> int:
+    # 태그는 시작할 때 붙고 games 행은 끝날 때 쓰이므로, 재시작 후에도 겹치지 않도록
+    # 원장(bet)과 기록에 남은 가장 큰 번호부터 이어감
+    # CAST 는 숫자 부분에서 멈추므로 샤드 접미사(M00042-1)가 붙은 태그도 같이 셈
+    n = 0
+    for table in ("games", "transactions"):
+        row = cursor.execute(
+            f"SELECT MAX(CAST(substr(tag, 2) AS INTEGER)) FROM {table} WHERE game='mines' AND tag GLOB 'M[0-9]*'"
+        ).fetchone()
+        n = max(n, row[0] or 0)
+    return n
+
+game_counter = last_tag_number()
 
 # ─── 3) Persistence helpers ─────────────────────────────────────
 def get_user_data(uid):
@@ -48,15 +116,37 @@ def get_user_data(uid):
     if row: return row
     cursor.execute("INSERT INTO users(user_id) VALUES(?)", (str(uid),))
     conn.commit()
+    ledger.record(uid, 1000, "signup")
+    mark_rank_dirty()
     return (1000,100)
 
 def update_user_data(uid, chips=None, last_bet=None):
     if chips is not None:
         cursor.execute("UPDATE users SET chips=? WHERE user_id=?", (chips, str(uid)))
+        mark_rank_dirty()
     if last_bet is not None:
         cursor.execute("UPDATE users SET last_bet=? WHERE user_id=?", (last_bet, str(uid)))
     conn.commit()
 
+def try_debit(uid, amount, reason, tag=None) -> bool:
+    # 잔액 확인과 차감을 한 문장으로: 다른 샤드 프로세스와 동시에 써도 음수가 되지 않음
+    cursor.execute(
+        "UPDATE users SET chips=chips-? WHERE user_id=? AND chips>=?",
+        (amount, str(uid), amount)
+    )
+    conn.commit()
+    if cursor.rowcount == 0:
+        return False
+    ledger.record(uid, -amount, reason, tag)
+    mark_rank_dirty()
+    return True
+
+def add_chips(uid, delta, reason, tag=None):
+    cursor.execute("UPDATE users SET chips=chips+? WHERE user_id=?", (delta, str(uid)))
+    conn.commit()
+    ledger.record(uid, delta, reason, tag)
+    mark_rank_dirty()
+
 def get_user_settings(uid):
     get_user_data(uid)
     cursor.execute("SELECT default_size,default_mines FROM users WHERE user_id=?", (str(uid),))
@@ -78,12 +168,137 @@ def get_user_stats(uid):
 def add_win(uid):
     cursor.execute("UPDATE users SET wins=wins+1 WHERE user_id=?", (str(uid),))
     conn.commit()
+    mark_rank_dirty()
 
 def add_loss(uid):
     cursor.execute("UPDATE users SET losses=losses+1 WHERE user_id=?", (str(uid),))
     conn.commit()
+    mark_rank_dirty()
+
+def claim_attendance(uid, reward):
+    # PK 조회 한 번으로 오늘 출석 여부 확인; 이미 받았으면 None
+    get_user_data(uid)
+    today = date.today().isoformat()
+    last, streak = cursor.execute(
+        "SELECT last_attendance,attend_streak FROM users WHERE user_id=?", (str(uid),)
+    ).fetchone()
+    if last == today:
+        return None
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    streak = (streak or 0) + 1 if last == yesterday else 1
+    # last_attendance 조건부 UPDATE 로 중복 지급 방지
+    cursor.execute(
+        "UPDATE users SET chips=chips+?, last_attendance=?, attend_streak=? "
+        "WHERE user_id=? AND last_attendance IS NOT ?",
+        (reward, today, streak, str(uid), today)
+    )
+    conn.commit()
+    if cursor.rowcount == 0:
+        return None
+    ledger.record(uid, reward, "attendance")
+    mark_rank_dirty()
+    return streak
+
+@tasks.loop(seconds=5)
+async def flush_buffers():
+    # 예외가 나면 tasks.loop 가 멈추므로 여기서 잡고 다음 주기에 다시 시도 (버퍼는 남아 있음)
+    try:
+        ledger.tick()
+        history.flush()
+    except Exception as e:
+        print(f"⚠️ flush failed: {e!r}")
+
+@tasks.loop(hours=BACKUP_INTERVAL_H)
+async def backup_loop():
+    await run_backup(compact=True)
+
+async def run_backup(compact=False):
+    ledger.flush()
+    history.flush()
+    # 워커 스레드에서 실행하므로 게임 이벤트 루프는 막히지 않음
+    dest = await asyncio.to_thread(backup_db, DB_PATH)
+    if compact:
+        await asyncio.to_thread(compact_db, DB_PATH)
+    return dest
+
+# ─── 4) Leaderboard ─────────────────────────────────────────────
+RANK_PAGE_SIZE   = 10
+RANK_MIN_GAMES   = 10    # 승률 랭킹에 들어가기 위한 최소 판수
+RANK_REFRESH_SEC = 30
 
-# ─── 4) Multiplier ───────────────────────────────────────────────
+# sort_key -> (label, score expr, WHERE 절)
+RANK_ORDERS = {
+    "chips":   ("칩", "chips", ""),
+    "wins":    ("승리 수", "wins", ""),
+    "winrate": ("승률", "CAST(wins AS REAL)/(wins+losses)",
+                f"WHERE wins+losses >= {RANK_MIN_GAMES}"),
+}
+
+# wallet 쓰기가 있으면 dirty 표시만 하고, 재계산은 주기적으로 한 번에
+rank_state = {"dirty": True}
+
+def mark_rank_dirty():
+    rank_state["dirty"] = True
+
+def rebuild_leaderboard():
+    # 워커 스레드에서 별도 연결로 실행 (asyncio.to_thread)
+    # - users 는 WAL 읽기 스냅샷으로만 읽으므로 게임 쪽 쓰기를 막지 않음
+    # - 새 테이블을 다 채운 뒤 한 트랜잭션에서 교체 → /rank 는 항상 완성된 랭킹만 봄
+    c = sqlite3.connect(DB_PATH, timeout=DB_TIMEOUT, isolation_level=None)
+    try:
+        c.execute("ATTACH DATABASE ? AS lb", (RANK_DB_PATH,))
+        c.execute("DROP TABLE IF EXISTS lb.leaderboard_new")
+        c.execute(LEADERBOARD_DDL.format(name="leaderboard_new"))
+        c.execute("BEGIN")
+        for key, (_, expr, where) in RANK_ORDERS.items():
+            c.execute(f"""
+                INSERT INTO lb.leaderboard_new(sort_key,rank,user_id,score,chips,wins,losses)
+                SELECT ?, ROW_NUMBER() OVER (ORDER BY {expr} DESC, user_id),
+                       user_id, {expr}, chips, wins, losses
+                FROM main.users {where}
+            """, (key,))
+        c.execute("DROP TABLE lb.leaderboard")
+        c.execute("ALTER TABLE lb.leaderboard_new RENAME TO leaderboard")
+        c.execute("COMMIT")
+    finally:
+        c.close()
+
+async def refresh_leaderboard(force=False):
+    if not (force or rank_state["dirty"]):
+        return
+    # 재계산 도중 들어온 쓰기도 놓치지 않도록 먼저 내리고, 실패하면 다시 세움
+    rank_state["dirty"] = False
+    try:
+        await asyncio.to_thread(rebuild_leaderboard)
+    except Exception:
+        rank_state["dirty"] = True
+        raise
+
+def get_rank_page(key, page):
+    # rank 가 PK 이므로 깊은 페이지도 1페이지와 같은 비용 (OFFSET 스캔 없음)
+    after = (page-1) * RANK_PAGE_SIZE
+    return cursor.execute(
+        "SELECT rank,user_id,chips,wins,losses FROM lb.leaderboard "
+        "WHERE sort_key=? AND rank>? ORDER BY rank LIMIT ?",
+        (key, after, RANK_PAGE_SIZE)
+    ).fetchall()
+
+def leaderboard_count(key):
+    # rank 는 1부터 빈틈없이 매겨지므로 MAX(rank) = 행 수 (PK 끝 한 번 조회)
+    return cursor.execute(
+        "SELECT COALESCE(MAX(rank),0) FROM lb.leaderboard WHERE sort_key=?", (key,)
+    ).fetchone()[0]
+
+@tasks.loop(seconds=RANK_REFRESH_SEC)
+async def leaderboard_refresher():
+    # 다른 프로세스의 지갑 쓰기는 dirty 로 알 수 없으므로 다중 프로세스면 매번
+    # 예외가 나면 tasks.loop 가 멈추므로 여기서 잡고 다음 주기에 다시 시도
+    try:
+        await refresh_leaderboard(force=multi_process(config))
+    except Exception as e:
+        print(f"⚠️ leaderboard refresh failed: {e!r}")
+
+# ─── 5) Multiplier ───────────────────────────────────────────────
 def calculate_stake_multiplier(d,m,k):
     if k==0: return 1.00
     p=1.0
@@ -91,16 +306,33 @@ def calculate_stake_multiplier(d,m,k):
         p *= (d-m-i)/(d-i)
     return round(1/p,2)
 
-# ─── 5) Bot setup ────────────────────────────────────────────────
-intents = discord.Intents.default()
-intents.message_content = True
-bot  = commands.Bot(command_prefix="!", intents=intents)
+# ─── 6) Bot setup ────────────────────────────────────────────────
+if LEAN_MODE:
+    # 최소 intents + 멤버 청킹/캐시 없음: 초대 추적용 가입/초대 이벤트만 받음
+    intents = discord.Intents.none()
+    intents.guilds = intents.invites = intents.members = True
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True   # on_member_join (초대 추적)
+bot  = commands.AutoShardedBot(
+    command_prefix="!", intents=intents,
+    **lean_client_options(LEAN_MODE), **shard_options(config)
+)
 tree = bot.tree
+member_names = MemberNames()
 
 # track all DM‐sent messages per user
 active_games = defaultdict(list)
+# Cashout 메시지 id -> 진행 중 게임 (고정 custom_id 뷰가 메시지로 게임을 찾음)
+cash_games = {}
+
+# 버튼 보드는 Discord 컴포넌트 25개 제한 때문에 5×5 까지, 그 이상은 이미지 보드
+BUTTON_BOARD_MAX = 5
+MAX_BOARD_SIZE   = board_render.MAX_RENDER_SIZE if board_render.available() else BUTTON_BOARD_MAX
+MAX_SELECT_OPTS  = 25
 
-# ─── 6) UI Components ───────────────────────────────────────────
+# ─── 7) UI Components ───────────────────────────────────────────
 class BetModal(Modal, title="베팅 금액 입력"):
     def __init__(self, user: discord.User):
         super().__init__()
@@ -108,25 +340,33 @@ class BetModal(Modal, title="베팅 금액 입력"):
         self.bet  = TextInput(label="베팅할 칩 수", placeholder="100", required=True)
         self.add_item(self.bet)
     async def on_submit(self, interaction: discord.Interaction):
-        amt = int(self.bet.value)
-        chips,_ = get_user_data(self.user.id)
-        if not (1<=amt<=chips):
-            return await interaction.response.send_message("⚠️ 잘못된 금액입니다.", ephemeral=True)
-        update_user_data(self.user.id, last_bet=amt)
-        await interaction.response.send_message(f"💰 `{amt}`칩으로 설정되었습니다.")
-        msg = await interaction.original_response()
-        active_games[self.user.id].append(msg)
+        async with user_lock(self.user.id):
+            amt = int(self.bet.value)
+            chips,_ = get_user_data(self.user.id)
+            if not (1<=amt<=chips):
+                return await interaction.response.send_message("⚠️ 잘못된 금액입니다.", ephemeral=True)
+            update_user_data(self.user.id, last_bet=amt)
+            await interaction.response.send_message(f"💰 `{amt}`칩으로 설정되었습니다.")
+            msg = await interaction.original_response()
+            active_games[self.user.id].append(msg)
 
 class BoardSizeSelect(Select):
     def __init__(self, uid):
-        opts=[discord.SelectOption(label=f"{i}×{i}", value=str(i)) for i in range(2,6)]
+        opts=[
+            discord.SelectOption(label=f"{i}×{i}" + (" (이미지)" if i>BUTTON_BOARD_MAX else ""), value=str(i))
+            for i in range(2,MAX_BOARD_SIZE+1)
+        ]
         super().__init__(placeholder="보드 크기 선택", min_values=1, max_values=1, options=opts)
         self.uid = uid
     async def callback(self, interaction: discord.Interaction):
         size = int(self.values[0])
-        update_user_settings(self.uid, size=size)
         maxm = size*size - 1
-        view = View(timeout=60)
+        # 지뢰 선택을 닫고 나가도 작은 판에 지뢰가 넘치지 않게 먼저 맞춰 둠
+        update_user_settings(self.uid, size=size, mines=min(get_user_settings(self.uid)["mines"], maxm))
+        if maxm > MAX_SELECT_OPTS:
+            # 선택지가 25개를 넘으면 Select 대신 입력창
+            return await interaction.response.send_modal(MineCountModal(self.uid, size, maxm))
+        view = RateLimitedView(timeout=60)
         view.add_item(MineCountSelect(self.uid, maxm))
         await interaction.response.send_message(
             f"📐 `{size}×{size}`판 설정됨. 지뢰 (1–{maxm}) 선택하세요.", view=view
@@ -146,48 +386,143 @@ class MineCountSelect(Select):
         msg = await interaction.original_response()
         active_games[self.uid].append(msg)
 
-class SettingsView(View):
+class MineCountModal(Modal, title="지뢰 개수 입력"):
+    def __init__(self, uid, size, maxm):
+        super().__init__()
+        self.uid, self.size, self.maxm = uid, size, maxm
+        self.count = TextInput(label=f"지뢰 개수 (1–{maxm})", placeholder="10", required=True)
+        self.add_item(self.count)
+    async def on_submit(self, interaction: discord.Interaction):
+        v = self.count.value.strip()
+        m = int(v) if v.isdigit() else 0
+        if not (1<=m<=self.maxm):
+            return await interaction.response.send_message("⚠️ 잘못된 개수입니다.", ephemeral=True)
+        update_user_settings(self.uid, mines=m)
+        await interaction.response.send_message(f"📐 `{self.size}×{self.size}`판, 💣 `{m}`개로 설정되었습니다.")
+        msg = await interaction.original_response()
+        active_games[self.uid].append(msg)
+
+class SettingsView(RateLimitedView):
+    action = "menu"
     def __init__(self, uid):
         super().__init__(timeout=60)
         self.add_item(BoardSizeSelect(uid))
 
-class RetryView(View):
-    def __init__(self, uid):
-        super().__init__(timeout=60)
-        self.uid = uid
-    @discord.ui.button(label="🔁 다시 하기", style=discord.ButtonStyle.primary)
+# 메뉴 / 다시 하기 / Cashout 은 custom_id 가 고정된 영구 뷰: 시작할 때 한 번 add_view 로
+# 등록하고 모든 메시지가 같은 인스턴스를 공유 (유저별 View 생성 없음, 재시작 후에도 동작).
+# 전부 본인 DM 에 보내는 메시지라 누른 사람 = 주인이므로 interaction.user 로 처리
+async def clear_messages(uid):
+    cnt = 0
+    for m in active_games.pop(uid, []):
+        cash_games.pop(m.id, None)
+        try: await m.delete(); cnt+=1
+        except: pass
+    return cnt
+
+class RetryView(RateLimitedView):
+    action = "menu"
+    def __init__(self):
+        super().__init__(timeout=None)
+    @discord.ui.button(label="🔁 다시 하기", style=discord.ButtonStyle.primary, custom_id="mines:retry")
     async def retry(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.uid:
-            return await interaction.response.send_message("❗ 당신의 게임이 아닙니다.", ephemeral=True)
-        old = active_games.pop(self.uid, [])
-        for m in old:
-            try: await m.delete()
-            except: pass
-        await interaction.response.send_message("⌛ 잠시만 기다려주세요...")
-        wait = await interaction.original_response()
-        active_games[self.uid].append(wait)
-        embed,view = build_menu(self.uid)
-        menu = await interaction.followup.send(embed=embed, view=view)
-        active_games[self.uid].append(menu)
-
-class CashoutView(View):
-    def __init__(self, uid, game):
+        uid = interaction.user.id
+        async with user_lock(uid):
+            await clear_messages(uid)
+            await interaction.response.send_message("⌛ 잠시만 기다려주세요...")
+            wait = await interaction.original_response()
+            active_games[uid].append(wait)
+            embed,view = build_menu(uid)
+            menu = await interaction.followup.send(embed=embed, view=view)
+            active_games[uid].append(menu)
+
+class CashoutView(RateLimitedView):
+    def __init__(self):
         super().__init__(timeout=None)
-        self.uid, self.game = uid, game
-    @discord.ui.button(label="💸 Cashout", style=discord.ButtonStyle.primary)
+    @discord.ui.button(label="💸 Cashout", style=discord.ButtonStyle.primary, custom_id="mines:cashout")
     async def cash(self, interaction: discord.Interaction, button: Button):
-        if interaction.user.id != self.uid or self.game["over"]:
-            return
-        self.game["over"]=True
-        d,m,k = self.game["size"]**2, self.game["mine_count"], self.game["safe_clicked"]
-        mult = calculate_stake_multiplier(d,m,k)
-        rew  = int(self.game["bet"] * mult)
-        chips,_ = get_user_data(self.uid)
-        update_user_data(self.uid, chips=chips+rew)
-        add_win(self.uid)
-        cash_msg = active_games[self.uid][-1]
-        e = discord.Embed(description=f"✅ Cashout! `{rew}`칩 획득 (x{mult})", color=0x00ff00)
-        await cash_msg.edit(embed=e, view=RetryView(self.uid))
+        uid = interaction.user.id
+        # 락 안에서 over 를 확인하므로 연타해도 한 번만 지급 (idempotent)
+        async with user_lock(uid):
+            game = cash_games.pop(interaction.message.id, None)
+            if game is None or game["user_id"] != uid:
+                # 재시작 등으로 진행 상태가 사라진 게임
+                return await interaction.response.send_message(
+                    "⌛ 만료된 게임입니다. 봇 재시작 등으로 진행 상태가 사라져 Cashout 할 수 없습니다.", ephemeral=True
+                )
+            if game["over"]:
+                return await interaction.response.defer()
+            game["over"]=True
+            d,m,k = game["size"]**2, game["mine_count"], game["safe_clicked"]
+            mult = calculate_stake_multiplier(d,m,k)
+            rew  = int(game["bet"] * mult)
+            add_chips(uid, rew, "cashout", game["tag"])
+            # 한 칸도 안 열고(x1.00) 돌려받은 판은 무승부: 승리 수/승률 랭킹을 공짜로 올릴 수 없게
+            if rew > game["bet"]:
+                add_win(uid)
+            record_game(game, "cashout", rew, mult)
+            e = reveal_seed(discord.Embed(description=f"✅ Cashout! `{rew}`칩 획득 (x{mult})", color=0x00ff00), game)
+            await interaction.response.edit_message(embed=e, view=views["retry"])
+
+def new_game(uid, bet, mines, size):
+    global game_counter
+    game_counter += 1
+    tag  = f"M{game_counter:05d}{TAG_SUFFIX}"
+    seed = new_server_seed()
+    mask = mines_board(seed, uid, tag, size, mines)
+    return {
+        "user_id":uid,"tag":tag,"bet":bet,"mine_count":mines,
+        "size":size,"safe_clicked":0,
+        "seed":seed,"board":mask,"revealed":0,
+        "mines":{(c%size,c//size) for c in range(size*size) if mask>>c & 1},
+        "over":False
+    }
+
+def open_cell(game, x, y):
+    D,M = game["size"]**2, game["mine_count"]
+    bomb = (x,y) in game["mines"]
+    game["revealed"] |= 1 << (y*game["size"]+x)
+    if bomb:
+        game["over"]=True; add_loss(game["user_id"])
+    else:
+        game["safe_clicked"]+=1
+    k=game["safe_clicked"]
+    return bomb, calculate_stake_multiplier(D,M,k), (D-M)-k
+
+def board_message(game, bomb=False):
+    # (embed, file): 이미지 보드면 캐시된 PNG 를 첨부
+    # embed 는 게임당 하나를 만들어 두고 클릭마다 바뀌는 줄과 색만 다시 채움
+    D,M,bet = game["size"]**2, game["mine_count"], game["bet"]
+    e=game.get("embed")
+    if e is None:
+        e=game["embed"]=discord.Embed(color=0x00ff00)
+        game["head"]=f"🎮 **{game['size']}×{game['size']}**\n💣지뢰: {M}개   💎남은 보석: "
+        game["tail"]=f"개\n🪙베팅: {bet} Chips   🟢수익: "
+        if game["size"] > BUTTON_BOARD_MAX:
+            e.set_image(url="attachment://board.png")
+    k=game["safe_clicked"]
+    profit=round(bet*calculate_stake_multiplier(D,M,k),2)
+    e.description=f"{game['head']}{(D-M)-k}{game['tail']}{profit:.2f} Chips"
+    if bomb:
+        e.colour=0xff0000
+    if game["size"] <= BUTTON_BOARD_MAX:
+        return e, None
+    png = board_render.render_board(game["size"], game["revealed"], game["revealed"] & game["board"])
+    return e, discord.File(io.BytesIO(png), filename="board.png")
+
+async def finish_turn(game, bomb, mult, remain):
+    uid=game["user_id"]
+    cash_msg=active_games[uid][-1]
+    if bomb:
+        cash_games.pop(cash_msg.id, None)
+        record_game(game, "bomb", 0, mult)
+        f=reveal_seed(discord.Embed(description="💥 실패했습니다. 다시 하시겠습니까?", color=0xff0000), game)
+        await cash_msg.edit(embed=f,view=views["retry"])
+    elif remain==0:
+        cash_games.pop(cash_msg.id, None)
+        game["over"]=True; add_win(uid)
+        record_game(game, "clear", 0, mult)
+        a=reveal_seed(discord.Embed(description="✅ 전부 발견! 자동 Cashout", color=0x00ff00), game)
+        await cash_msg.edit(embed=a,view=views["retry"])
 
 class MinesButton(Button):
     def __init__(self, x, y, game):
@@ -195,114 +530,308 @@ class MinesButton(Button):
         self.x,self.y,self.game = x,y,game
         self.clicked=False
     async def callback(self, interaction: discord.Interaction):
-        if self.clicked or self.game["over"] or interaction.user.id!=self.game["user_id"]:
+        if interaction.user.id!=self.game["user_id"]:
             return await interaction.response.defer(ephemeral=True)
-        self.clicked=True
-        D,M,bet = self.game["size"]**2, self.game["mine_count"], self.game["bet"]
-        bomb = (self.x,self.y) in self.game["mines"]
-        if bomb:
-            self.style,self.label=discord.ButtonStyle.danger,"💣"
-            self.game["over"]=True; add_loss(self.game["user_id"])
-        else:
-            self.style,self.label=discord.ButtonStyle.success,"💎"
-            self.game["safe_clicked"]+=1
-        k= self.game["safe_clicked"]
-        mult=calculate_stake_multiplier(D,M,k)
-        profit=round(bet*mult,2)
-        remain=(D-M)-k
-        e=discord.Embed(
-            description=(
-                f"🎮 **{self.game['size']}×{self.game['size']}**\n"
-                f"💣지뢰: {M}개   💎남은 보석: {remain}개\n"
-                f"🪙베팅: {bet} Chips   🟢수익: {profit:.2f} Chips"
-            ),
-            color=0xff0000 if bomb else 0x00ff00
-        )
-        await interaction.response.edit_message(embed=e,view=self.view)
-        cash_msg=active_games[self.game["user_id"]][-1]
-        if bomb:
-            f=discord.Embed(description="💥 실패했습니다. 다시 하시겠습니까?", color=0xff0000)
-            await cash_msg.edit(embed=f,view=RetryView(self.game["user_id"]))
-        elif not bomb and remain==0:
-            self.game["over"]=True; add_win(self.game["user_id"])
-            a=discord.Embed(description="✅ 전부 발견! 자동 Cashout", color=0x00ff00)
-            await cash_msg.edit(embed=a,view=RetryView(self.game["user_id"]))
-
-class MinesView(View):
+        # Cashout 과 같은 락: 클릭/캐시아웃이 섞여 stale 상태를 보지 않도록
+        async with user_lock(self.game["user_id"]):
+            if self.clicked or self.game["over"]:
+                return await interaction.response.defer(ephemeral=True)
+            self.clicked=True
+            bomb,mult,remain = open_cell(self.game, self.x, self.y)
+            if bomb:
+                self.style,self.label=discord.ButtonStyle.danger,"💣"
+            else:
+                self.style,self.label=discord.ButtonStyle.success,"💎"
+            e,_ = board_message(self.game, bomb)
+            await interaction.response.edit_message(embed=e,view=self.view)
+            await finish_turn(self.game, bomb, mult, remain)
+
+class MinesView(RateLimitedView):
     def __init__(self, uid, bet, mines, size):
         super().__init__(timeout=None)
-        self.game={
-            "user_id":uid,"bet":bet,"mine_count":mines,
-            "size":size,"safe_clicked":0,
-            "mines":set(random.sample([(x,y) for x in range(size) for y in range(size)],mines)),
-            "over":False
-        }
+        self.game=new_game(uid, bet, mines, size)
         for y in range(size):
             for x in range(size):
                 self.add_item(MinesButton(x,y,self.game))
 
-# ─── 7) Menu builder ───────────────────────────────────────────
+class CellSelect(Select):
+    # 이미지 보드 좌표 선택 (열 A~J / 행 1~10)
+    def __init__(self, axis, size):
+        if axis=="x":
+            opts=[discord.SelectOption(label=f"{board_render.COLS[i]}열", value=str(i)) for i in range(size)]
+        else:
+            opts=[discord.SelectOption(label=f"{i+1}행", value=str(i)) for i in range(size)]
+        super().__init__(placeholder="열 선택" if axis=="x" else "행 선택",
+                         min_values=1, max_values=1, options=opts, row=0 if axis=="x" else 1)
+        self.axis = axis
+    async def callback(self, interaction: discord.Interaction):
+        self.view.pick[self.axis] = int(self.values[0])
+        await interaction.response.defer()
+
+class RenderedMinesView(RateLimitedView):
+    def __init__(self, uid, bet, mines, size):
+        super().__init__(timeout=None)
+        self.game=new_game(uid, bet, mines, size)
+        self.pick={}
+        self.add_item(CellSelect("x", size))
+        self.add_item(CellSelect("y", size))
+    @discord.ui.button(label="⛏ 열기", style=discord.ButtonStyle.success, row=2)
+    async def open(self, interaction: discord.Interaction, button: Button):
+        if interaction.user.id!=self.game["user_id"]:
+            return await interaction.response.defer(ephemeral=True)
+        async with user_lock(self.game["user_id"]):
+            if self.game["over"]:
+                return await interaction.response.defer(ephemeral=True)
+            if len(self.pick) < 2:
+                return await interaction.response.send_message("❗ 열과 행을 먼저 선택하세요.", ephemeral=True)
+            x,y = self.pick["x"], self.pick["y"]
+            if self.game["revealed"] >> (y*self.game["size"]+x) & 1:
+                return await interaction.response.send_message("❗ 이미 연 칸입니다.", ephemeral=True)
+            bomb,mult,remain = open_cell(self.game, x, y)
+            e,f = board_message(self.game, bomb)
+            await interaction.response.edit_message(embed=e,attachments=[f],view=self)
+            await finish_turn(self.game, bomb, mult, remain)
+
+def record_game(game, outcome, payout, mult):
+    # 지뢰 위치는 (y*size+x) 비트마스크를 hex 로 저장, seed 는 검증용
+    history.record(
+        game["user_id"], game["tag"], game["bet"], payout, outcome,
+        multiplier=mult, size=game["size"], mines=game["mine_count"],
+        board=format(game["board"],"x"), seed=game["seed"]
+    )
+
+def reveal_seed(embed, game):
+    embed.set_footer(text=f"🔓 {game['tag']} seed: {game['seed']}")
+    return embed
+
+# ─── 8) Menu builder ───────────────────────────────────────────
+MENU_FIELDS = ("💵마지막 베팅", "💰잔액", "🏆승리 수", "💀패배 수", "💣지뢰 수", "🟩보드 크기")
+
 def build_menu(uid:int):
     cfg    = get_user_settings(uid)
     chips,last = get_user_data(uid)
     wins,losses = get_user_stats(uid)
 
     embed=discord.Embed(title="MINES",color=0x00ff00)
-    embed.add_field(name="💵마지막 베팅",value=f"{last}칩",inline=True)
-    embed.add_field(name="💰잔액",      value=f"{chips}칩",inline=True)
-    embed.add_field(name="🏆승리 수",   value=str(wins),inline=True)
-    embed.add_field(name="💀패배 수",   value=str(losses),inline=True)
-    embed.add_field(name="💣지뢰 수",   value=f"{cfg['mines']}개",inline=True)
-    embed.add_field(name="🟩보드 크기", value=f"{cfg['size']}×{cfg['size']}",inline=True)
-
-    view=View(timeout=60)
-    view.add_item(Button(label="🔧설정",custom_id="settings",style=discord.ButtonStyle.secondary))
-    view.add_item(Button(label="💵베팅 입력",custom_id="bet",style=discord.ButtonStyle.secondary))
-    view.add_item(Button(label="▶️시작",custom_id="start",style=discord.ButtonStyle.success))
-
-    async def chk(i:discord.Interaction):
-        if i.user.id!=uid:
-            await i.response.send_message("❗ 당신만 사용할 수 있습니다.",ephemeral=True)
-            return False
-        cid=i.data["custom_id"]
-        if cid=="settings":
-            msg=await i.response.send_message("📐보드 크기 선택:",view=SettingsView(uid),ephemeral=True)
-            active_games[uid].append(await i.original_response())
-        elif cid=="bet":
-            await i.response.send_modal(BetModal(i.user))
-        elif cid=="start":
+    values=(f"{last}칩", f"{chips}칩", str(wins), str(losses), f"{cfg['mines']}개", f"{cfg['size']}×{cfg['size']}")
+    for name, value in zip(MENU_FIELDS, values):
+        embed.add_field(name=name, value=value, inline=True)
+    return embed, views["menu"]
+
+class MenuView(RateLimitedView):
+    action = "menu"
+    def __init__(self):
+        super().__init__(timeout=None)
+
+    @discord.ui.button(label="🔧설정", style=discord.ButtonStyle.secondary, custom_id="mines:settings")
+    async def settings(self, i: discord.Interaction, button: Button):
+        await i.response.send_message("📐보드 크기 선택:",view=SettingsView(i.user.id),ephemeral=True)
+        active_games[i.user.id].append(await i.original_response())
+
+    @discord.ui.button(label="💵베팅 입력", style=discord.ButtonStyle.secondary, custom_id="mines:bet")
+    async def bet(self, i: discord.Interaction, button: Button):
+        await i.response.send_modal(BetModal(i.user))
+
+    @discord.ui.button(label="▶️시작", style=discord.ButtonStyle.success, custom_id="mines:start")
+    async def start(self, i: discord.Interaction, button: Button):
+        uid = i.user.id
+        async with user_lock(uid):
             cfg2=get_user_settings(uid)
             size,mines=cfg2["size"],cfg2["mines"]
             chips2,last2=get_user_data(uid)
             if last2>chips2:
                 return await i.response.send_message("❌ 잔액 부족",ephemeral=True)
-            update_user_data(uid,chips=chips2-last2)
-            mv=MinesView(uid,last2,mines,size)
+            if size>MAX_BOARD_SIZE:
+                return await i.response.send_message("❌ 이 보드 크기는 현재 사용할 수 없습니다. 설정을 바꿔주세요.",ephemeral=True)
+            if not (1<=mines<size*size):
+                return await i.response.send_message("❌ 지뢰 수가 보드 크기에 맞지 않습니다. 설정을 바꿔주세요.",ephemeral=True)
+            mv=(MinesView if size<=BUTTON_BOARD_MAX else RenderedMinesView)(uid,last2,mines,size)
+            if not try_debit(uid,last2,"bet",mv.game["tag"]):
+                return await i.response.send_message("❌ 잔액 부족",ephemeral=True)
             await i.response.defer(ephemeral=True)
             dm=await i.user.create_dm()
-            init=discord.Embed(
-                description=(
-                    f"🎮 **{size}×{size}**\n"
-                    f"💣지뢰: {mines}개   💎남은 보석: {size*size-mines}개\n"
-                    f"🪙베팅: {last2} Chips   🟢수익: {last2*1.00:.2f} Chips"
-                ),color=0x00ff00
-            )
-            bmsg=await dm.send(embed=init,view=mv)
-            cmsg=await dm.send(embed=discord.Embed(description="💸Cashout?",color=0xffff00),
-                               view=CashoutView(uid,mv.game))
+            init,f=board_message(mv.game)
+            bmsg=await dm.send(embed=init,view=mv,file=f)
+            ask=discord.Embed(description="💸Cashout?",color=0xffff00)
+            ask.set_footer(text=f"🔒 {mv.game['tag']} seed hash: {seed_hash(mv.game['seed'])}")
+            cmsg=await dm.send(embed=ask,view=views["cashout"])
+            cash_games[cmsg.id]=mv.game
             active_games[uid].extend([bmsg,cmsg])
-        return True
 
-    view.interaction_check=chk
-    return embed,view
+# 영구 뷰 인스턴스 (View 는 실행 중인 이벤트 루프가 필요하므로 setup_hook 에서 생성)
+views = {}
+
+def register_views():
+    views.update(menu=MenuView(), retry=RetryView(), cashout=CashoutView())
+    for v in views.values():
+        bot.add_view(v)
+
+# ─── 9) Invite tracking ────────────────────────────────────────
+# 길드별 초대 사용 횟수 스냅샷을 메모리에 유지하고 이벤트로 갱신.
+# 가입 시 guild.invites() 는 디바운스로 여러 가입을 묶어 한 번만 호출하고,
+# 초대한 사람별 증가량만 필요하므로 누가 어떤 코드로 들어왔는지는 몰라도 됨.
+INVITE_DEBOUNCE_SEC = 2
+INVITE_GONE_TTL     = 10   # 1회용 초대 소진으로 삭제된 것으로 볼 시간
+
+invite_uses    = {}                 # guild_id -> {code: (uses, inviter_id, max_uses)}
+invite_gone    = defaultdict(dict)  # guild_id -> {code: (uses, inviter_id, max_uses, deleted_at)}
+invite_pending = set()              # diff 예약된 guild_id
+invite_locks   = defaultdict(asyncio.Lock)  # guild_id -> 스냅샷 읽기~교체 직렬화
+invite_tiers   = {"src": None}
+
+def snapshot_invite(inv):
+    return (inv.uses or 0, inv.inviter.id if inv.inviter else None, inv.max_uses or 0)
+
+async def load_invites(guild):
+    async with invite_locks[guild.id]:
+        try:
+            invs = await guild.invites()
+        except discord.HTTPException:
+            invite_uses.pop(guild.id, None)   # 권한 없음 → 추적 안 함
+            return
+        invite_uses[guild.id] = {i.code: snapshot_invite(i) for i in invs}
+
+def add_invites(credit):
+    # 한 트랜잭션으로 초대 수 일괄 반영
+    rows = [(n, str(uid)) for uid, n in credit.items()]
+    for uid in credit:
+        # 처음 보는 초대자는 여기서 지갑이 생기므로 get_user_data 처럼 signup 원장 기록
+        cursor.execute("INSERT OR IGNORE INTO users(user_id) VALUES(?)", (str(uid),))
+        if cursor.rowcount:
+            ledger.record(uid, 1000, "signup")
+    cursor.executemany("UPDATE users SET invites=invites+? WHERE user_id=?", rows)
+    conn.commit()
+    mark_rank_dirty()
+
+async def diff_invites(guild):
+    # guild.invites() 가 디바운스보다 오래 걸려도 다음 diff 는 교체된 스냅샷부터 시작
+    async with invite_locks[guild.id]:
+        old = invite_uses.get(guild.id, {})
+        try:
+            invs = await guild.invites()
+        except discord.HTTPException:
+            return
+        new = {i.code: snapshot_invite(i) for i in invs}
+        credit = defaultdict(int)
+        for code, (uses, inviter, _) in new.items():
+            prev = old.get(code, (0,))[0]
+            if inviter and uses > prev:
+                credit[inviter] += uses - prev
+        now = time.monotonic()
+        for code, (uses, inviter, max_uses, at) in invite_gone.pop(guild.id, {}).items():
+            if inviter and max_uses and uses+1 >= max_uses and now-at <= INVITE_GONE_TTL:
+                credit[inviter] += max_uses - uses
+        invite_uses[guild.id] = new
+        if credit:
+            add_invites(credit)
+
+def get_invite_tiers():
+    cfg = load_json("invite_rewards.json")
+    if invite_tiers["src"] is not cfg:
+        base = sorted((int(k), v) for k, v in cfg["base"].items())
+        prefix = [0]
+        for _, v in base:
+            prefix.append(prefix[-1] + v)
+        invite_tiers.update(
+            src=cfg,
+            thresholds=[k for k, _ in base],
+            prefix=prefix,
+            top=base[-1][0] if base else 0,
+            interval=cfg.get("bonus_interval", 0),
+            bonus=cfg.get("bonus_reward", 0),
+        )
+    return invite_tiers
+
+def calc_invite_reward(last, n):
+    # (last, n] 구간에서 새로 달성한 구간 보상 합 (이분 탐색 + 누적합)
+    t  = get_invite_tiers()
+    th = t["thresholds"]
+    reward = t["prefix"][bisect_right(th, n)] - t["prefix"][bisect_right(th, last)]
+    iv = t["interval"]
+    if iv and n > t["top"]:
+        lo = max(last, t["top"])
+        reward += (n//iv - lo//iv) * t["bonus"]
+    return reward
+
+def claim_invite_reward(uid):
+    get_user_data(uid)
+    n, last = cursor.execute(
+        "SELECT invites,invites_last_claim FROM users WHERE user_id=?", (str(uid),)
+    ).fetchone()
+    reward = calc_invite_reward(last, n) if n > last else 0
+    cursor.execute(
+        "UPDATE users SET chips=chips+?, invites_last_claim=? WHERE user_id=? AND invites_last_claim=?",
+        (reward, n, str(uid), last)
+    )
+    conn.commit()
+    if cursor.rowcount == 0:
+        reward = 0
+    elif reward:
+        ledger.record(uid, reward, "invite_reward")
+        mark_rank_dirty()
+    return n, reward
+
+@bot.event
+async def on_invite_create(invite):
+    snap = invite_uses.get(invite.guild.id)
+    if snap is not None:
+        snap[invite.code] = snapshot_invite(invite)
+
+@bot.event
+async def on_invite_delete(invite):
+    snap = invite_uses.get(invite.guild.id)
+    if snap and invite.code in snap:
+        invite_gone[invite.guild.id][invite.code] = snap.pop(invite.code) + (time.monotonic(),)
+
+@bot.event
+async def on_member_join(member):
+    gid = member.guild.id
+    if member.bot or gid not in invite_uses or gid in invite_pending:
+        return
+    invite_pending.add(gid)
+    await asyncio.sleep(INVITE_DEBOUNCE_SEC)
+    invite_pending.discard(gid)
+    await diff_invites(member.guild)
+
+# ─── 10) Commands & Rank/Admin ───────────────────────────────────
+TREE_HASH_PATH = DB_PATH + ".treehash"
+startup_done   = False
+
+@bot.event
+async def setup_hook():
+    # 게이트웨이 연결 전에 등록: 첫 interaction 부터 영구 뷰 / 메뉴가 준비돼 있음
+    register_views()
+
+async def refresh_invites():
+    for g in bot.guilds:
+        await load_invites(g)
 
-# ─── 8) Commands & Rank/Admin ───────────────────────────────────
 @bot.event
 async def on_ready():
+    global startup_done
     print(f"✅ Logged in as {bot.user}")
-    await tree.sync(guild=test_guild)
+    # 끊긴 동안 초대 이벤트를 놓쳤을 수 있으므로 스냅샷은 매번 다시 맞춤
+    # (길드마다 HTTP 1회라 오래 걸릴 수 있으므로 백그라운드로)
+    bot.loop.create_task(refresh_invites())
+    # 재접속 시 on_ready 가 다시 불려도 시작 작업은 한 번만
+    if startup_done:
+        return
+    startup_done = True
+    flush_buffers.start()
+    # kill -USR1 <pid> 로도 프로파일 (콘솔에 요약 출력)
+    install_signal_handler(bot.loop, "mines")
+    if not PRIMARY:
+        return
+    # 공유 랭킹 테이블은 한 프로세스만 다시 만듦
+    leaderboard_refresher.start()
+    backup_loop.start()
+    for scope in SYNC_SCOPES:
+        if await sync_if_changed(tree, scope, TREE_HASH_PATH):
+            print(f"🔄 command tree synced ({scope.id if scope else 'global'})")
 
 @tree.command(name="mines",description="Mines 시작",guild=test_guild)
+@guild_config.check(allow_dm=True)
+@rate_limited("command")
 async def mines_cmd(inter:discord.Interaction):
     await inter.response.send_message("✅ DM으로 메뉴를 보냈습니다!",ephemeral=True)
     dm=await inter.user.create_dm()
@@ -311,20 +840,59 @@ async def mines_cmd(inter:discord.Interaction):
     active_games[inter.user.id].append(menu)
 
 @tree.command(name="clear",description="내 DM 메시지 삭제",guild=test_guild)
+@rate_limited("command")
 async def clear_cmd(inter:discord.Interaction):
-    uid=inter.user.id
-    msgs=active_games.pop(uid,[])
-    cnt=0
-    for m in msgs:
-        try: await m.delete(); cnt+=1
-        except: pass
+    cnt=await clear_messages(inter.user.id)
     await inter.response.send_message(f"✅ {cnt}개의 DM 메시지를 삭제했습니다.",ephemeral=True)
 
+@tree.command(name="attend",description="출석 체크 (하루 한 번 칩 지급)",guild=test_guild)
+@rate_limited("command")
+async def attend_cmd(inter:discord.Interaction):
+    uid=inter.user.id
+    reward=load_json("attendance_rewards.json")["daily_reward"]
+    async with user_lock(uid):
+        streak=claim_attendance(uid,reward)
+    if streak is None:
+        return await inter.response.send_message("❗ 오늘은 이미 출석했습니다.",ephemeral=True)
+    chips,_=get_user_data(uid)
+    e=discord.Embed(
+        description=(
+            f"📅 출석 완료! `{reward}`칩 지급\n"
+            f"🔥 연속 출석: {streak}일   💰잔액: {chips}칩"
+        ),color=0x00ff00
+    )
+    await inter.response.send_message(embed=e,ephemeral=True)
+
+@tree.command(name="invites",description="초대 보상 확인 및 수령",guild=test_guild)
+@rate_limited("command")
+async def invites_cmd(inter:discord.Interaction):
+    uid=inter.user.id
+    async with user_lock(uid):
+        n,reward=claim_invite_reward(uid)
+    e=discord.Embed(title="📨 초대 보상",color=0x00ff00 if reward else 0x95A5A6)
+    e.add_field(name="👥 초대 수",value=f"{n}명",inline=True)
+    e.add_field(name="🎁 이번 수령",value=f"{reward}칩" if reward else "없음",inline=True)
+    await inter.response.send_message(embed=e,ephemeral=True)
+
+MINES_OUTCOMES = {"cashout":"💸Cashout", "bomb":"💥실패", "clear":"✅전부 발견"}
+
+def fmt_mines_row(r):
+    _,ts,tag,bet,payout,outcome,mult,size,mines,_,_ = r
+    return (f"`{tag}` <t:{ts}:d> {size}×{size} 💣{mines} | "
+            f"🪙{bet} → {payout} ({MINES_OUTCOMES.get(outcome,outcome)} x{mult})")
+
+@tree.command(name="history",description="내 Mines 게임 기록",guild=test_guild)
+@rate_limited("command")
+async def history_cmd(inter:discord.Interaction):
+    view=HistoryView(history,inter.user.id,fmt_mines_row,"📜 Mines 기록")
+    await inter.response.send_message(embed=view.build_embed(),view=view,ephemeral=True)
+
 @tree.command(
     name="chip",
     description="내 칩 잔액과 랭킹/승률을 확인합니다.",
     guild=test_guild
 )
+@rate_limited("heavy")
 async def chip_cmd(inter: discord.Interaction):
     uid = inter.user.id
     chips, _    = get_user_data(uid)
@@ -371,32 +939,53 @@ async def chip_cmd(inter: discord.Interaction):
 
 @tree.command(
     name="rank",
-    description="Top10 랭킹 보기",
+    description="칩/승리/승률 랭킹 보기",
     guild=test_guild
 )
-async def rank_cmd(inter: discord.Interaction):
-    # DB에서 Top10 가져오기
-    rows = cursor.execute(
-        "SELECT user_id, chips, wins, losses FROM users ORDER BY chips DESC LIMIT 10"
-    ).fetchall()
+@app_commands.describe(
+    page="페이지 번호 (1부터)",
+    sort="정렬 기준"
+)
+@app_commands.choices(sort=[
+    app_commands.Choice(name="칩", value="chips"),
+    app_commands.Choice(name="승리 수", value="wins"),
+    app_commands.Choice(name=f"승률 ({RANK_MIN_GAMES}판 이상)", value="winrate"),
+])
+@rate_limited("heavy")
+async def rank_cmd(
+    inter: discord.Interaction,
+    page: int = 1,
+    sort: app_commands.Choice[str] = None
+):
+    key = sort.value if sort else "chips"
+    total = leaderboard_count(key)
+    pages = max(1, -(-total // RANK_PAGE_SIZE))
+    if not (1 <= page <= pages):
+        return await inter.response.send_message(
+            f"❌ 페이지는 1~{pages} 사이로 입력하세요.", ephemeral=True
+        )
 
-    embed = discord.Embed(title="🏆 Top 10 Chip Ranking", color=0xFFD700)
-    guild = bot.get_guild(GUILD_ID)
+    # 구체화된 랭킹에서 해당 페이지만 가져오기
+    rows  = get_rank_page(key, page)
+    label = RANK_ORDERS[key][0]
 
-    for idx, (uid, chips, wins, losses) in enumerate(rows, start=1):
-        # 길드 캐시에 없으면 fetch
-        member = guild.get_member(int(uid)) or await guild.fetch_member(int(uid))
-        # display_name 사용 (길드별 닉네임 or 유저네임)
-        name = member.display_name
+    embed = discord.Embed(title=f"🏆 {label} 랭킹 ({page}/{pages})", color=0xFFD700)
+    guild = inter.guild
+
+    for idx, uid, chips, wins, losses in rows:
+        # 길드 캐시에 없으면 fetch (크기 제한 캐시에 보관)
+        name = await member_names.display_name(guild, int(uid))
 
         total_games = wins + losses
         win_rate    = (wins / total_games * 100) if total_games else 0.0
 
         embed.add_field(
             name=f"{idx}. {name}",
-            value=f"💰 {chips}칩 | 승률 {win_rate:.1f}%",
+            value=f"💰 {chips}칩 | {wins}승 | 승률 {win_rate:.1f}%",
             inline=False
         )
+    if not rows:
+        embed.description = "랭킹에 등록된 유저가 없습니다."
 
     await inter.response.send_message(embed=embed, ephemeral=True)
 
@@ -404,7 +993,7 @@ async def rank_cmd(inter: discord.Interaction):
 @tree.command(
     name="info",
     description="유저 정보 조회 (관리자 전용)",
-    guild=test_guild
+    guild=admin_guild
 )
 @app_commands.describe(
     user="정보를 조회할 대상 유저를 선택하세요"
@@ -466,7 +1055,7 @@ async def info_cmd_error(inter: discord.Interaction, error):
         )
         raise
 
-@tree.command(name="edit",description="유저 정보 수정 (관리자)",guild=test_guild)
+@tree.command(name="edit",description="유저 정보 수정 (관리자)",guild=admin_guild)
 @app_commands.checks.has_permissions(administrator=True)
 async def edit_cmd(
     inter:discord.Interaction,
@@ -487,17 +1076,93 @@ async def edit_cmd(
             f"❌ 수정 불가 필드: `{field}`", ephemeral=True
         )
     col = allowed[field]
-    if col in ("chips","last_bet"):
-        update_user_data(user.id, **{col:value})
+    if col=="chips":
+        old,_ = get_user_data(user.id)
+        update_user_data(user.id, chips=value)
+        ledger.record(user.id, value-old, "admin_edit")
+    elif col=="last_bet":
+        update_user_data(user.id, last_bet=value)
     elif col in ("default_size","default_mines"):
         update_user_settings(user.id, **{col.split("_")[1]:value})
     else:
         cursor.execute(f"UPDATE users SET {col}=? WHERE user_id=?", (value, str(user.id)))
         conn.commit()
+        mark_rank_dirty()
     await inter.response.send_message(
         f"✅ `{user}`의 `{field}`을 `{value}`로 수정했습니다.", ephemeral=True
     )
 
+@tree.command(name="gameinfo",description="게임 태그로 기록 조회 (관리자)",guild=admin_guild)
+@app_commands.describe(tag="게임 태그 (예: M00042)")
+@app_commands.checks.has_permissions(administrator=True)
+async def gameinfo_cmd(inter:discord.Interaction, tag:str):
+    rows = history.by_tag(tag)
+    if not rows:
+        return await inter.response.send_message(f"❌ `{tag}` 기록이 없습니다.", ephemeral=True)
+    embed = discord.Embed(title=f"🎮 {tag}", color=0x00BFFF)
+    for uid, *r in rows:
+        embed.add_field(
+            name=f"👤 {uid}",
+            value=f"<@{uid}>\n{fmt_mines_row(r)}\n💣 board: `{r[9]}`",
+            inline=False
+        )
+    await inter.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="backup",description="DB 온라인 백업 (관리자)",guild=admin_guild)
+@app_commands.describe(compact="백업 후 빈 페이지 정리 + WAL 체크포인트")
+@app_commands.checks.has_permissions(administrator=True)
+async def backup_cmd(inter:discord.Interaction, compact:bool=False):
+    await inter.response.defer(ephemeral=True)
+    dest = await run_backup(compact=compact)
+    await inter.followup.send(f"✅ 백업 완료: `{dest}`", ephemeral=True)
+
+@tree.command(name="ratestats",description="rate limit 통계 (관리자)",guild=admin_guild)
+@app_commands.checks.has_permissions(administrator=True)
+async def ratestats_cmd(inter:discord.Interaction):
+    await inter.response.send_message(embed=stats_embed(), ephemeral=True)
+
+@tree.error
+async def on_tree_error(inter:discord.Interaction, error):
+    if isinstance(error, RateLimited):
+        return await reject(inter)
+    if isinstance(error, WrongChannel):
+        return await inter.response.send_message(str(error), ephemeral=True)
+    await app_commands.CommandTree.on_error(tree, inter, error)
+
+@tree.command(name="sync",description="명령어 트리 강제 sync (관리자)",guild=admin_guild)
+@app_commands.checks.has_permissions(administrator=True)
+async def sync_cmd(inter:discord.Interaction):
+    await inter.response.defer(ephemeral=True)
+    for scope in SYNC_SCOPES:
+        await sync_if_changed(tree, scope, TREE_HASH_PATH, force=True)
+    await inter.followup.send("✅ 명령어 트리를 sync 했습니다.", ephemeral=True)
+
+@tree.command(name="setchannel",description="이 서버에서 /mines 를 쓸 채널 지정 (서버 관리자)",guild=test_guild)
+@app_commands.describe(channel="비워 두면 제한 해제")
+@app_commands.guild_only()
+@app_commands.checks.has_permissions(administrator=True)
+async def setchannel_cmd(inter:discord.Interaction, channel:discord.TextChannel=None):
+    guild_config.set_channel(inter.guild_id, channel.id if channel else None)
+    msg = f"✅ /mines 채널: {channel.mention}" if channel else "✅ /mines 채널 제한을 해제했습니다."
+    await inter.response.send_message(msg, ephemeral=True)
+
+@tree.command(name="profile",description="샘플링 프로파일 (관리자)",guild=admin_guild)
+@app_commands.describe(seconds="측정 시간 (초)")
+@app_commands.checks.has_permissions(administrator=True)
+async def profile_cmd(inter:discord.Interaction, seconds:app_commands.Range[int,5,MAX_WINDOW]=DEFAULT_WINDOW):
+    if profiler.running:
+        return await inter.response.send_message("⏳ 이미 프로파일링 중입니다.", ephemeral=True)
+    await inter.response.defer(ephemeral=True)
+    summary, paths = await profiler.run(seconds, "mines")
+    embed = discord.Embed(title="📈 Profile", description=f"```\n{summary[:4000]}\n```", color=0x95A5A6)
+    await inter.followup.send(embed=embed, files=[discord.File(p) for p in paths], ephemeral=True)
+
+@setchannel_cmd.error
+@profile_cmd.error
+@sync_cmd.error
+@ratestats_cmd.error
+@backup_cmd.error
+@gameinfo_cmd.error
 @info_cmd.error
 @edit_cmd.error
 async def admin_error(inter:discord.Interaction, error):
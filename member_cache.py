@@ -0,0 +1,45 @@
+import time
+from collections import OrderedDict
+
+import discord
+
+# lean 모드에서는 길드 멤버를 캐시하지 않으므로, 닉네임이 필요한 몇 곳에서만
+# 필요할 때 fetch 하고 크기 제한 LRU 에 잠깐 보관
+MAX_NAMES = 2048
+NAME_TTL  = 600   # 초
+
+class MemberNames:
+    def __init__(self, maxsize=MAX_NAMES, ttl=NAME_TTL):
+        self.maxsize, self.ttl = maxsize, ttl
+        self.names = OrderedDict()   # (guild_id, uid) -> (name, expires)
+
+    async def display_name(self, guild, uid: int) -> str:
+        member = guild.get_member(uid) if guild else None
+        if member:
+            return member.display_name
+        key = (guild.id if guild else 0, uid)
+        hit = self.names.get(key)
+        now = time.monotonic()
+        if hit and hit[1] > now:
+            self.names.move_to_end(key)
+            return hit[0]
+        try:
+            name = (await guild.fetch_member(uid)).display_name if guild else str(uid)
+        except discord.HTTPException:   # 서버를 나간 유저 등
+            name = str(uid)
+        self.names[key] = (name, now + self.ttl)
+        self.names.move_to_end(key)
+        while len(self.names) > self.maxsize:
+            self.names.popitem(last=False)
+        return name
+
+    async def many(self, guild, uids):
+        return [await self.display_name(guild, u) for u in uids]
+
+def lean_client_options(lean: bool) -> dict:
+    if not lean:
+        return {}
+    return {
+        "chunk_guilds_at_startup": False,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+    }
@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import signal
+import asyncio
+import threading
+from collections import Counter
+
+# 운영 중 재시작 없이 켜는 샘플링 프로파일러
+# - cpu: 별도 스레드가 이벤트 루프 스레드의 파이썬 스택을 주기적으로 찍음
+#   (sqlite / 이미지 / embed 생성처럼 루프를 붙잡고 있는 시간)
+# - await: 루프 위에서 모든 task 의 await 체인을 찍음
+#   (Discord HTTP 등 콜백이 기다리는 시간)
+# 결과는 flamegraph.pl / speedscope 에 바로 넣을 수 있는 collapsed stack(.folded) 파일과
+# 우리 콜백별로 묶은 top-N 요약(.txt)
+PROFILE_DIR     = "profiles"
+CPU_INTERVAL    = 0.005   # 초
+AWAIT_INTERVAL  = 0.02
+DEFAULT_WINDOW  = 30
+MAX_WINDOW      = 300
+TOP_N           = 15
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUR_FILES = {f for f in os.listdir(ROOT) if f.endswith(".py")}
+
+def _label(code) -> str:
+    name = getattr(code, "co_qualname", code.co_name)   # co_qualname: 3.11+
+    path = code.co_filename
+    if os.path.dirname(os.path.abspath(path)) == ROOT:
+        return f"{os.path.basename(path)}:{name}"
+    return f"{os.path.basename(os.path.dirname(path))}/{os.path.basename(path)}:{name}"
+
+def _is_ours(label: str) -> bool:
+    return label.split(":", 1)[0] in OUR_FILES
+
+def _is_idle(label: str) -> bool:
+    # 루프가 이벤트를 기다리는 중 (selector.select)
+    return label.split(":", 1)[0].endswith("selectors.py")
+
+class Profiler:
+    def __init__(self):
+        self.running = False
+
+    def _sample_cpu(self, tid, stacks, lines, stop):
+        while not stop.wait(CPU_INTERVAL):
+            frame = sys._current_frames().get(tid)
+            if frame is None:
+                continue
+            leaf = f"{_label(frame.f_code)}:{frame.f_lineno}"
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            stacks[tuple(reversed(stack))] += 1
+            lines[leaf] += 1
+
+    def _sample_awaits(self, stacks, me):
+        for task in asyncio.all_tasks():
+            if task is me:
+                continue
+            stack, coro = [], task.get_coro()
+            while coro is not None:
+                frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+                if frame is not None:
+                    stack.append(_label(frame.f_code))
+                coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+            # 타이머로 쉬고 있는 주기 작업은 지연이 아니므로 제외
+            if stack and not stack[-1].endswith(":sleep"):
+                stacks[tuple(stack)] += 1
+
+    async def run(self, seconds: int, name: str):
+        if self.running:
+            raise RuntimeError("profiler already running")
+        self.running = True
+        cpu, lines, awaits = Counter(), Counter(), Counter()
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample_cpu, args=(threading.get_ident(), cpu, lines, stop), daemon=True
+        )
+        me = asyncio.current_task()
+        sampler.start()
+        try:
+            end = time.monotonic() + seconds
+            while time.monotonic() < end:
+                self._sample_awaits(awaits, me)
+                await asyncio.sleep(AWAIT_INTERVAL)
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+            self.running = False
+        return write_report(name, seconds, cpu, lines, awaits)
+
+profiler = Profiler()
+
+def _owner(stack) -> str:
+    # 스택에서 가장 바깥쪽 우리 코드 프레임 = 이 시간을 쓴 콜백 / 명령어
+    # (bot.run 을 부르는 모듈 최상위 프레임은 제외)
+    return next((f for f in stack if _is_ours(f) and not f.endswith(":<module>")), "(discord.py / 기타)")
+
+def summarize(cpu: Counter, lines: Counter, awaits: Counter) -> str:
+    total = sum(cpu.values())
+    idle  = sum(n for s, n in cpu.items() if _is_idle(s[-1]))
+    busy  = Counter()
+    for stack, n in cpu.items():
+        if not _is_idle(stack[-1]):
+            busy[_owner(stack)] += n
+    out = [f"[CPU] 샘플 {total} · 유휴 {idle / total * 100 if total else 0:.1f}%"]
+    for owner, n in busy.most_common(TOP_N):
+        out.append(f"{n / total * 100:6.1f}%  {owner}")
+    out.append("")
+    out.append("[CPU] 많이 찍힌 줄")
+    for leaf, n in lines.most_common(TOP_N):
+        if not _is_idle(leaf):
+            out.append(f"{n:6d}  {leaf}")
+    out.append("")
+    # await 쪽은 (콜백, 기다리는 곳) 으로 묶음: 예) MinesButton.callback → http.py:HTTPClient.request
+    waits = Counter()
+    for stack, n in awaits.items():
+        owner = _owner(stack)
+        if owner.startswith("("):
+            continue
+        waits[(owner, stack[-1])] += n
+    out.append(f"[await] 샘플 {sum(waits.values())} (task × {AWAIT_INTERVAL * 1000:.0f}ms)")
+    for (owner, leaf), n in waits.most_common(TOP_N):
+        out.append(f"{n:6d}  {owner} → {leaf}")
+    return "\n".join(out)
+
+def _write_folded(path, stacks: Counter):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, n in stacks.most_common():
+            f.write(f"{';'.join(stack)} {n}\n")
+
+def write_report(name, seconds, cpu, lines, awaits):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}")
+    summary = f"{name} · {seconds}s\n\n" + summarize(cpu, lines, awaits)
+    _write_folded(base + "-cpu.folded", cpu)
+    _write_folded(base + "-await.folded", awaits)
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(summary + "\n")
+    return summary, [base + ".txt", base + "-cpu.folded", base + "-await.folded"]
+
+def install_signal_handler(loop, name: str, seconds: int = DEFAULT_WINDOW) -> bool:
+    # kill -USR1 <pid> 로 프로파일 시작 (Windows 는 SIGUSR1 없음)
+    if not hasattr(signal, "SIGUSR1"):
+        return False
+
+    async def run():
+        summary, paths = await profiler.run(seconds, name)
+        print(summary)
+        print(f"📈 profile saved: {', '.join(paths)}")
+
+    def start():
+        if not profiler.running:
+            loop.create_task(run())
+    loop.add_signal_handler(signal.SIGUSR1, start)
+    return True
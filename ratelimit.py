@@ -0,0 +1,90 @@
+import time
+from collections import Counter
+
+import discord
+from discord import app_commands
+from discord.ui import View
+
+# 유저 × 액션 종류별 token bucket
+# - 명령어는 rate_limited() 데코레이터, 버튼/셀렉트는 RateLimitedView.interaction_check 에서
+#   DB/HTTP 작업 전에 거르고, 버려진 요청 수를 액션별로 집계
+# action -> (초당 회복 토큰, 최대 버스트)
+RULES = {
+    "command": (1/3,  3),   # 일반 슬래시 명령어
+    "heavy":   (1/10, 2),   # 전체 테이블을 읽는 명령어 (/chip, /rank)
+    "menu":    (1.0,  4),   # 메뉴 / 설정 / 베팅 버튼
+    "join":    (0.5,  3),   # 참가 / 취소 토글
+    "game":    (5.0, 10),   # 게임 진행 클릭
+}
+MAX_BUCKETS = 50000
+
+class RateLimited(app_commands.CheckFailure):
+    pass
+
+class TokenBucketLimiter:
+    def __init__(self, rules=RULES):
+        self.rules   = rules
+        self.buckets = {}          # (action, uid) -> [tokens, last]
+        self.allowed = Counter()
+        self.shed    = Counter()
+
+    def allow(self, uid: int, action: str) -> bool:
+        rate, burst = self.rules[action]
+        now = time.monotonic()
+        b = self.buckets.get((action, uid))
+        if b is None:
+            if len(self.buckets) >= MAX_BUCKETS:
+                self._prune(now)
+            b = self.buckets[(action, uid)] = [burst, now]
+        else:
+            b[0] = min(burst, b[0] + (now - b[1]) * rate)
+            b[1] = now
+        if b[0] >= 1:
+            b[0] -= 1
+            self.allowed[action] += 1
+            return True
+        self.shed[action] += 1
+        return False
+
+    def _prune(self, now):
+        # 이미 가득 찼을 버킷은 지워도 동작이 같음 → 메모리 상한 유지
+        for key, (tokens, last) in list(self.buckets.items()):
+            rate, burst = self.rules[key[0]]
+            if tokens + (now - last) * rate >= burst:
+                del self.buckets[key]
+
+    def stats(self):
+        return {a: (self.allowed[a], self.shed[a]) for a in self.rules}
+
+limiter = TokenBucketLimiter()
+
+async def reject(interaction: discord.Interaction):
+    if not interaction.response.is_done():
+        await interaction.response.send_message("⏳ 너무 빠릅니다. 잠시 후 다시 시도하세요.", ephemeral=True)
+
+async def guard(interaction: discord.Interaction, action: str) -> bool:
+    if limiter.allow(interaction.user.id, action):
+        return True
+    await reject(interaction)
+    return False
+
+def rate_limited(action: str = "command"):
+    def predicate(inter: discord.Interaction) -> bool:
+        if not limiter.allow(inter.user.id, action):
+            raise RateLimited(action)
+        return True
+    return app_commands.check(predicate)
+
+class RateLimitedView(View):
+    action = "game"
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await guard(interaction, self.action)
+
+def stats_embed():
+    embed = discord.Embed(title="⏳ Rate limit", color=0x95A5A6)
+    for action, (ok, shed) in limiter.stats().items():
+        total = ok + shed
+        pct = shed / total * 100 if total else 0.0
+        embed.add_field(name=action, value=f"허용 {ok} / 차단 {shed} ({pct:.1f}%)", inline=True)
+    return embed
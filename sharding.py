@@ -0,0 +1,34 @@
+# keys.json 의 shard_count / shard_ids 로 샤드를 여러 프로세스에 나눠 띄움
+# - 생략하면 AutoShardedBot 이 권장 샤드 수를 받아 한 프로세스에서 전부 실행
+# - 길드는 항상 한 샤드(= 한 프로세스)에만 속하므로 길드 단위 상태는 프로세스별로 둬도 됨
+# - DM interaction 은 항상 샤드 0 으로 오므로 DM 게임 진행은 샤드 0 프로세스에서만 일어남
+#   (Mines: 메뉴가 영구 뷰라 DM 안에서 시작~종료까지 샤드 0. Dice 는 길드 채널에서 시작한
+#    게임의 버튼을 DM 으로 보내므로 다중 프로세스 미지원)
+# - 지갑/원장/기록은 같은 SQLite 파일(WAL)을 공유: user_lock 은 프로세스 안에서만 유효하므로
+#   다른 프로세스와 겹칠 수 있는 지갑 쓰기는 조건부 UPDATE 한 문장으로 처리
+DB_TIMEOUT = 30   # 다른 프로세스가 쓰기 중일 때 기다릴 시간(초)
+
+def shard_options(cfg: dict) -> dict:
+    opts = {}
+    if cfg.get("shard_count"):
+        opts["shard_count"] = cfg["shard_count"]
+        if cfg.get("shard_ids") is not None:
+            opts["shard_ids"] = cfg["shard_ids"]
+    return opts
+
+def multi_process(cfg: dict) -> bool:
+    return cfg.get("shard_ids") is not None
+
+def is_primary(cfg: dict) -> bool:
+    # 백업 / 잔액 스냅샷 / 명령어 sync 같은 전역 작업은 샤드 0 을 가진 프로세스에서만
+    return not multi_process(cfg) or 0 in cfg["shard_ids"]
+
+def tag_suffix(cfg: dict) -> str:
+    # 게임 번호는 프로세스마다 따로 세므로 프로세스를 나누면 태그 충돌 방지용 접미사
+    return f"-{min(cfg['shard_ids'])}" if multi_process(cfg) else ""
+
+def ledger_options(cfg: dict) -> dict:
+    if not multi_process(cfg):
+        return {}
+    # 다른 프로세스의 스냅샷이 이 프로세스의 미반영 버퍼를 놓치지 않도록 바로 기록
+    return {"flush_size": 1, "snapshots": is_primary(cfg)}
@@ -0,0 +1,38 @@
+import os
+import json
+import hashlib
+
+# 명령어 트리 JSON 의 해시를 DB 옆 파일에 저장해 두고, 바뀌었을 때만 sync
+# (재접속마다 sync 하면 API 왕복 + rate limit 위험)
+
+def tree_hash(tree, guild=None) -> str:
+    payload = []
+    for cmd in tree.get_commands(guild=guild):
+        try:
+            payload.append(cmd.to_dict(tree))
+        except TypeError:   # discord.py < 2.4
+            payload.append(cmd.to_dict())
+    payload.sort(key=lambda c: (c.get("type", 1), c["name"]))
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def _load(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+async def sync_if_changed(tree, guild, path, force=False) -> bool:
+    scope  = str(guild.id) if guild else "global"
+    digest = tree_hash(tree, guild)
+    saved  = _load(path)
+    if not force and saved.get(scope) == digest:
+        return False
+    await tree.sync(guild=guild)
+    saved[scope] = digest
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(saved, f)
+    os.replace(tmp, path)
+    return True
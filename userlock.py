@@ -0,0 +1,22 @@
+import asyncio
+
+# 유저별 비동기 락 (lock striping)
+# - 고정 개수의 락을 uid 해시로 나눠 쓰므로 유저 수와 무관하게 메모리 일정
+# - 같은 유저의 콜백은 직렬화, 다른 유저는 (해시 충돌이 없는 한) 병렬
+# - 재진입 불가: 락을 잡은 채 같은 uid 로 다시 잡으면 교착
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+class StripedLock:
+    def __init__(self, stripes: int = 256):
+        self._locks = [asyncio.Lock() for _ in range(stripes)]
+
+    def _index(self, uid: int) -> int:
+        # snowflake 하위 비트는 편향될 수 있어 fibonacci hashing 으로 섞음
+        h = (int(uid) * _GOLDEN) & _MASK64
+        return (h >> 32) % len(self._locks)
+
+    def __call__(self, uid: int) -> asyncio.Lock:
+        return self._locks[self._index(uid)]
+
+user_lock = StripedLock()